@@ -0,0 +1,119 @@
+"""
+Versión async de los routers, activada con DB_ASYNC=true.
+
+Cada endpoint sync se envuelve en un endpoint `async def` que recibe una
+AsyncSession y ejecuta el cuerpo original con `AsyncSession.run_sync`.
+Así la E/S de base de datos va por el driver async (asyncpg / aiosqlite)
+sobre el event loop, sin ocupar el threadpool de Starlette, y la lógica
+de negocio no se duplica.
+"""
+import inspect
+from fastapi import APIRouter, Depends
+from fastapi.routing import APIRoute
+
+from . import database
+from .auth import get_current_user, get_current_user_async
+from .etags import verificar_etag, verificar_etag_async
+
+
+# Dependencias sync -> equivalente async
+DEPENDENCIAS_ASYNC = {
+    database.get_db: database.get_async_db,
+    get_current_user: get_current_user_async,
+    verificar_etag: verificar_etag_async,
+}
+
+
+def dependencias_async(dependencias):
+    """Traduce las dependencias a nivel de ruta (dependencies=[...])."""
+
+    return [
+        Depends(DEPENDENCIAS_ASYNC[d.dependency])
+        if d.dependency in DEPENDENCIAS_ASYNC else d
+        for d in dependencias
+    ]
+
+
+def endpoint_async(endpoint):
+
+    firma = inspect.signature(endpoint)
+    parametros = []
+    nombre_db = None
+
+    for parametro in firma.parameters.values():
+        dependencia = getattr(parametro.default, "dependency", None)
+
+        if dependencia in DEPENDENCIAS_ASYNC:
+            if dependencia is database.get_db:
+                nombre_db = parametro.name
+
+            parametro = parametro.replace(
+                default=Depends(DEPENDENCIAS_ASYNC[dependencia]),
+                annotation=inspect.Parameter.empty
+            )
+
+        parametros.append(parametro)
+
+    # Sin sesión no hay nada que adaptar
+    if nombre_db is None:
+        return endpoint
+
+    # Endpoints ya async (usan database.en_sesion): solo cambian las dependencias
+    if inspect.iscoroutinefunction(endpoint):
+
+        async def directo(**kwargs):
+            return await endpoint(**kwargs)
+
+        directo.__name__ = endpoint.__name__
+        directo.__doc__ = endpoint.__doc__
+        directo.__signature__ = firma.replace(parameters=parametros)
+
+        return directo
+
+    async def envoltorio(**kwargs):
+        db = kwargs.pop(nombre_db)
+
+        return await db.run_sync(
+            lambda sesion: endpoint(**kwargs, **{nombre_db: sesion})
+        )
+
+    envoltorio.__name__ = endpoint.__name__
+    envoltorio.__doc__ = endpoint.__doc__
+    envoltorio.__signature__ = firma.replace(parameters=parametros)
+
+    return envoltorio
+
+
+def router_async(router: APIRouter):
+    """Copia de un APIRouter con todos sus endpoints en versión async."""
+
+    nuevo = APIRouter()
+
+    for ruta in router.routes:
+
+        if not isinstance(ruta, APIRoute):
+            nuevo.routes.append(ruta)
+            continue
+
+        nuevo.add_api_route(
+            ruta.path,
+            endpoint_async(ruta.endpoint),
+            methods=list(ruta.methods),
+            response_model=ruta.response_model,
+            response_model_include=ruta.response_model_include,
+            response_model_exclude=ruta.response_model_exclude,
+            response_model_by_alias=ruta.response_model_by_alias,
+            response_model_exclude_unset=ruta.response_model_exclude_unset,
+            response_model_exclude_defaults=ruta.response_model_exclude_defaults,
+            response_model_exclude_none=ruta.response_model_exclude_none,
+            status_code=ruta.status_code,
+            tags=ruta.tags,
+            dependencies=dependencias_async(ruta.dependencies),
+            summary=ruta.summary,
+            description=ruta.description,
+            response_class=ruta.response_class,
+            name=ruta.name,
+            include_in_schema=ruta.include_in_schema,
+        )
+
+    return nuevo
@@ -1,23 +1,25 @@
-from passlib.context import CryptContext
 from jose import jwt
 from datetime import datetime, timedelta
 from .config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from .config import AUTH_CACHE_MAX_ITEMS, AUTH_CACHE_TTL_SEGUNDOS, AUTH_SOLO_CLAIMS
+from .config import HASH_ROUNDS
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
-from .database import get_db
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+from .database import get_db, get_async_db
 from . import models
+from .services.cache_service import CacheTTL
+from .services.hash_service import contexto_hash
 
 SECRET_KEY = "mi_clave_secreta"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# 👇 CAMBIAMOS bcrypt por pbkdf2_sha256
-pwd_context = CryptContext(
-    schemes=["pbkdf2_sha256"],
-    deprecated="auto"
-)
+# 👇 CAMBIAMOS bcrypt por pbkdf2_sha256 (rounds en HASH_ROUNDS).
+# Versión sync para scripts; los endpoints usan hash_service (pool de procesos).
+pwd_context = contexto_hash(HASH_ROUNDS)
 
 def hash_password(password: str):
     return pwd_context.hash(password)
@@ -33,6 +35,49 @@ def create_access_token(data: dict):
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="usuarios/login")
 
+# 🧠 Usuarios ya resueltos, por (usuario_id, token)
+cache_usuarios = CacheTTL(
+    max_items=AUTH_CACHE_MAX_ITEMS,
+    ttl_segundos=AUTH_CACHE_TTL_SEGUNDOS
+)
+
+
+def claims_usuario(usuario: models.Usuario):
+    """Datos de identidad que viajan en el token (modo solo claims)."""
+
+    return {
+        "sub": str(usuario.id),
+        "nombre": usuario.nombre,
+        "email": usuario.email
+    }
+
+
+def invalidar_usuario(usuario_id: int):
+    """Quita de la cache todas las sesiones del usuario."""
+
+    cache_usuarios.eliminar_si(lambda clave: clave[0] == usuario_id)
+
+
+@event.listens_for(models.Usuario, "after_update")
+@event.listens_for(models.Usuario, "after_delete")
+def _invalidar_al_modificar(mapper, connection, usuario):
+    invalidar_usuario(usuario.id)
+
+
+def _usuario_desacoplado(usuario_id: int, nombre, email):
+    """
+    Copia ligera de un usuario, sin sesión, lista para db.merge(load=False).
+    password_hash no se guarda; si alguien lo necesita se carga aparte.
+    """
+
+    copia = models.Usuario(
+        id=usuario_id,
+        nombre=nombre,
+        email=email
+    )
+    make_transient_to_detached(copia)
+    return copia
+
 def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
@@ -53,11 +98,42 @@ def get_current_user(
     except JWTError:
         raise credentials_exception
 
+    usuario_id = int(user_id)
+    clave = (usuario_id, token)
+
+    # 🔹 Modo solo claims: el token ya trae la identidad
+    if AUTH_SOLO_CLAIMS and "email" in payload:
+        copia = _usuario_desacoplado(
+            usuario_id, payload.get("nombre"), payload.get("email")
+        )
+        return db.merge(copia, load=False)
+
+    # 🔹 Cache de usuarios resueltos
+    copia = cache_usuarios.get(clave)
+
+    if copia is not None:
+        return db.merge(copia, load=False)
+
     usuario = db.query(models.Usuario).filter(
-        models.Usuario.id == int(user_id)
+        models.Usuario.id == usuario_id
     ).first()
 
     if usuario is None:
         raise credentials_exception
 
-    return usuario
\ No newline at end of file
+    cache_usuarios.set(
+        clave,
+        _usuario_desacoplado(usuario.id, usuario.nombre, usuario.email)
+    )
+
+    return usuario
+
+
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db=Depends(get_async_db)
+):
+    """Versión para AsyncSession: misma lógica, ejecutada con run_sync."""
+
+    return await db.run_sync(lambda sesion: get_current_user(token, sesion))
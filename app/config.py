@@ -8,6 +8,42 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
+# 🔌 Pool de conexiones (ajustar frente a max_connections de Postgres)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+# ⚡ Capa async (AsyncEngine/AsyncSession) para los routers principales
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() == "true"
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+
+# 🔐 Cache de usuarios autenticados
+AUTH_CACHE_MAX_ITEMS = int(os.getenv("AUTH_CACHE_MAX_ITEMS", "10000"))
+AUTH_CACHE_TTL_SEGUNDOS = float(os.getenv("AUTH_CACHE_TTL_SEGUNDOS", "60"))
+# Si está activo, el token lleva nombre/email y no se consulta la BD
+AUTH_SOLO_CLAIMS = os.getenv("AUTH_SOLO_CLAIMS", "false").lower() == "true"
+
+# 🗃️ Cache de respuestas de reportes (clave con la versión de datos del usuario)
+RESPUESTAS_CACHE_BACKEND = os.getenv("RESPUESTAS_CACHE_BACKEND", "memoria")
+RESPUESTAS_CACHE_MAX_ITEMS = int(os.getenv("RESPUESTAS_CACHE_MAX_ITEMS", "5000"))
+RESPUESTAS_CACHE_TTL_SEGUNDOS = float(os.getenv("RESPUESTAS_CACHE_TTL_SEGUNDOS", "600"))
+
+# 🔁 Idempotency-Key: horas que se guarda la primera respuesta
+IDEMPOTENCIA_TTL_HORAS = float(os.getenv("IDEMPOTENCIA_TTL_HORAS", "24"))
+
+# 🔑 Hash de contraseñas en un pool de procesos aparte
+HASH_ROUNDS = int(os.getenv("HASH_ROUNDS", "29000"))
+# 0 = sin procesos: se hashea en un hilo (útil en tests y scripts)
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", "2"))
+# Operaciones en cola + en curso antes de responder 503
+HASH_MAX_PENDIENTES = int(os.getenv("HASH_MAX_PENDIENTES", "32"))
+
+# 🛠️ Endpoints internos y /metrics: exigen X-Interno-Token; sin token
+# configurado responden 404
+INTERNAL_TOKEN = os.getenv("INTERNAL_TOKEN")
+
 if not DATABASE_URL:
     raise ValueError("No se encontró DATABASE_URL")
 
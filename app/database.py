@@ -1,9 +1,31 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from .config import DATABASE_URL
+from sqlalchemy.orm import sessionmaker, Session
+from starlette.concurrency import run_in_threadpool
+from .config import DATABASE_URL, DB_ASYNC, ASYNC_DATABASE_URL
+from .config import (
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING
+)
+from .pool import QueuePoolMedido, AsyncQueuePoolMedido, instrumentar
+from .metricas import instrumentar_sql
 
-engine = create_engine(DATABASE_URL)
+
+def opciones_pool(poolclass):
+    """Parámetros de pool comunes al engine sync y al async."""
+
+    return {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+engine = create_engine(DATABASE_URL, **opciones_pool(QueuePoolMedido))
+estadisticas_pool = instrumentar(engine)
+instrumentar_sql(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -15,3 +37,54 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# ⚡ Capa async: solo se crea si DB_ASYNC está activo, así el driver
+# async (asyncpg / aiosqlite) no es obligatorio en modo sync.
+def url_async(url: str):
+
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+
+    if url.startswith("postgresql://") or url.startswith("postgresql+psycopg2://"):
+        return "postgresql+asyncpg://" + url.split("://", 1)[1]
+
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url.split("://", 1)[1]
+
+    return url
+
+
+async_engine = None
+AsyncSessionLocal = None
+
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL or url_async(DATABASE_URL),
+        **opciones_pool(AsyncQueuePoolMedido)
+    )
+    instrumentar(async_engine.sync_engine)
+    instrumentar_sql(async_engine.sync_engine)
+
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        autoflush=False
+    )
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def en_sesion(db, funcion, *args):
+    """
+    Ejecuta funcion(sesion_sync, *args) desde un endpoint async, tanto con
+    Session (en el threadpool) como con AsyncSession (con run_sync).
+    """
+
+    if AsyncSessionLocal is not None and not isinstance(db, Session):
+        return await db.run_sync(funcion, *args)
+
+    return await run_in_threadpool(funcion, db, *args)
@@ -0,0 +1,74 @@
+"""
+ETags débiles para los endpoints de lectura.
+
+El ETag sale de la marca de la última escritura del usuario (versión y
+fecha en versiones_usuario, que suben con cada movimiento, transferencia,
+presupuesto o cuenta). Se calcula en una dependencia, antes del cuerpo
+del endpoint: si coincide con If-None-Match se responde 304 sin ejecutar
+ninguna consulta de agregados.
+"""
+from fastapi import Depends, Request, Response
+from sqlalchemy.orm import Session
+
+from . import database, models
+from .auth import get_current_user, get_current_user_async
+from .services.version_service import marca_datos
+
+
+class NoModificado(Exception):
+
+    def __init__(self, etag: str):
+        self.etag = etag
+
+
+def etag_usuario(usuario_id: int, version: int, actualizado_en):
+
+    marca = int(actualizado_en.timestamp() * 1000) if actualizado_en else 0
+    return f'W/"{usuario_id}-{version}-{marca}"'
+
+
+def coincide(if_none_match: str | None, etag: str):
+    """Comparación débil: se ignora el prefijo W/ y se acepta '*'."""
+
+    if not if_none_match:
+        return False
+
+    etiquetas = [e.strip() for e in if_none_match.split(",")]
+
+    if "*" in etiquetas:
+        return True
+
+    return etag.removeprefix("W/") in {e.removeprefix("W/") for e in etiquetas}
+
+
+def _verificar(request: Request, response: Response, usuario_id: int, marca):
+
+    etag = etag_usuario(usuario_id, *marca)
+
+    if coincide(request.headers.get("if-none-match"), etag):
+        raise NoModificado(etag)
+
+    response.headers["ETag"] = etag
+    # El navegador puede guardar la respuesta pero debe revalidar siempre
+    response.headers["Cache-Control"] = "private, no-cache"
+
+
+def verificar_etag(
+    request: Request,
+    response: Response,
+    db: Session = Depends(database.get_db),
+    current_user: models.Usuario = Depends(get_current_user)
+):
+
+    _verificar(request, response, current_user.id, marca_datos(db, current_user.id))
+
+
+async def verificar_etag_async(
+    request: Request,
+    response: Response,
+    db=Depends(database.get_async_db),
+    current_user: models.Usuario = Depends(get_current_user_async)
+):
+
+    marca = await db.run_sync(lambda sesion: marca_datos(sesion, current_user.id))
+    _verificar(request, response, current_user.id, marca)
@@ -1,5 +1,8 @@
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, Response
 from .database import engine
+from .config import DB_ASYNC
 from . import models
 from .routers import usuarios
 from .routers import cuentas
@@ -7,10 +10,25 @@ from .routers import movimientos
 from app.routers import dashboard
 from app.routers import finanzas
 from app.routers import transferencias
+from app.routers import interno
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import PlainTextResponse
+from fastapi.exceptions import RequestValidationError
+from fastapi.encoders import jsonable_encoder
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from .respuestas import RespuestaJSON
+from .etags import NoModificado
+from . import metricas
+from .services import hash_service
 
-app = FastAPI(default_response_class=JSONResponse)
+
+@asynccontextmanager
+async def ciclo_vida(app):
+    yield
+    hash_service.cerrar_pool()
+
+
+app = FastAPI(default_response_class=RespuestaJSON, lifespan=ciclo_vida)
 
 """ origins = [
     "http://localhost:49744",
@@ -26,20 +44,83 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 @app.middleware("http")
-async def force_utf8(request, call_next):
-    response = await call_next(request)
-    response.headers["Content-Type"] = "application/json; charset=utf-8"
+async def medir_request(request, call_next):
+    actual, token = metricas.iniciar_request()
+    inicio = time.perf_counter()
+
+    def cerrar(estado):
+        # Plantilla de la ruta (no la URL) para no disparar la cardinalidad
+        ruta = request.scope.get("route")
+        ruta = ruta.path if ruta is not None else "sin_ruta"
+
+        return metricas.terminar_request(
+            token, actual, request.method, ruta, estado,
+            time.perf_counter() - inicio
+        )
+
+    try:
+        response = await call_next(request)
+    except Exception:
+        cerrar(500)
+        raise
+
+    response.headers["Server-Timing"] = cerrar(response.status_code)
+
     return response
 
-app.include_router(usuarios.router)
-app.include_router(cuentas.router)
-app.include_router(movimientos.router)
-app.include_router(dashboard.router)
-app.include_router(finanzas.router)
-app.include_router(transferencias.router)
+# Errores con la misma respuesta JSON (charset incluido)
+@app.exception_handler(StarletteHTTPException)
+async def error_http(request, exc):
+    return RespuestaJSON(
+        {"detail": exc.detail},
+        status_code=exc.status_code,
+        headers=getattr(exc, "headers", None)
+    )
+
+# 304 sin cuerpo cuando If-None-Match coincide con el ETag actual
+@app.exception_handler(NoModificado)
+async def no_modificado(request, exc):
+    return Response(
+        status_code=304,
+        headers={"ETag": exc.etag, "Cache-Control": "private, no-cache"}
+    )
+
+@app.exception_handler(RequestValidationError)
+async def error_validacion(request, exc):
+    return RespuestaJSON(
+        {"detail": jsonable_encoder(exc.errors())},
+        status_code=422
+    )
+
+# ⚡ Con DB_ASYNC=true los routers más cargados usan AsyncSession
+if DB_ASYNC:
+    from .asincrono import router_async
+
+    app.include_router(router_async(usuarios.router))
+    app.include_router(cuentas.router)
+    app.include_router(router_async(movimientos.router))
+    app.include_router(router_async(dashboard.router))
+    app.include_router(finanzas.router)
+    app.include_router(router_async(transferencias.router))
+else:
+    app.include_router(usuarios.router)
+    app.include_router(cuentas.router)
+    app.include_router(movimientos.router)
+    app.include_router(dashboard.router)
+    app.include_router(finanzas.router)
+    app.include_router(transferencias.router)
+app.include_router(interno.router)
+
+@app.get("/metrics", response_class=PlainTextResponse, dependencies=[Depends(interno.verificar_interno)])
+def metrics():
+    return PlainTextResponse(
+        metricas.exponer_prometheus(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
 
 @app.get("/")
 def root():
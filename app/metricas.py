@@ -0,0 +1,227 @@
+"""
+Métricas por request: número de sentencias SQL y tiempo en base de datos.
+
+Los hooks de SQLAlchemy suman en el contador del request actual (vía
+contextvar) y el middleware publica el resultado en el header
+Server-Timing y en histogramas con formato de texto de Prometheus.
+"""
+import time
+import threading
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+# Contador mutable del request en curso; los hilos del threadpool
+# reciben una copia del contexto pero comparten este mismo dict.
+_request_actual = ContextVar("metricas_request", default=None)
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_CONSULTAS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+
+class Histograma:
+
+    def __init__(self, nombre: str, ayuda: str, buckets):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, etiquetas: tuple, valor: float):
+
+        with self._lock:
+            serie = self._series.get(etiquetas)
+
+            if serie is None:
+                serie = self._series[etiquetas] = {
+                    "conteos": [0] * len(self.buckets),
+                    "suma": 0.0,
+                    "total": 0
+                }
+
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie["conteos"][i] += 1
+
+            serie["suma"] += valor
+            serie["total"] += 1
+
+    def exponer(self, nombres_etiquetas: tuple):
+
+        lineas = [
+            f"# HELP {self.nombre} {self.ayuda}",
+            f"# TYPE {self.nombre} histogram",
+        ]
+
+        with self._lock:
+            for etiquetas, serie in sorted(self._series.items()):
+                base = ",".join(
+                    f'{n}="{_escapar(v)}"' for n, v in zip(nombres_etiquetas, etiquetas)
+                )
+
+                for limite, conteo in zip(self.buckets, serie["conteos"]):
+                    lineas.append(f'{self.nombre}_bucket{{{base},le="{limite}"}} {conteo}')
+
+                lineas.append(f'{self.nombre}_bucket{{{base},le="+Inf"}} {serie["total"]}')
+                lineas.append(f"{self.nombre}_sum{{{base}}} {serie['suma']}")
+                lineas.append(f"{self.nombre}_count{{{base}}} {serie['total']}")
+
+        return lineas
+
+
+class Contador:
+
+    def __init__(self, nombre: str, ayuda: str):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def incrementar(self, etiquetas: tuple, valor: float = 1):
+
+        with self._lock:
+            self._series[etiquetas] = self._series.get(etiquetas, 0) + valor
+
+    def exponer(self, nombres_etiquetas: tuple):
+
+        lineas = [
+            f"# HELP {self.nombre} {self.ayuda}",
+            f"# TYPE {self.nombre} counter",
+        ]
+
+        with self._lock:
+            for etiquetas, valor in sorted(self._series.items()):
+                base = ",".join(
+                    f'{n}="{_escapar(v)}"' for n, v in zip(nombres_etiquetas, etiquetas)
+                )
+                lineas.append(f"{self.nombre}{{{base}}} {valor}")
+
+        return lineas
+
+
+class Medidor:
+    """Valor instantáneo (gauge) que sube y baja."""
+
+    def __init__(self, nombre: str, ayuda: str):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.valor = 0
+        self._lock = threading.Lock()
+
+    def ajustar(self, delta: float):
+
+        with self._lock:
+            self.valor += delta
+
+    def exponer(self):
+
+        return [
+            f"# HELP {self.nombre} {self.ayuda}",
+            f"# TYPE {self.nombre} gauge",
+            f"{self.nombre} {self.valor}",
+        ]
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+ETIQUETAS_RUTA = ("method", "route")
+ETIQUETAS_ESTADO = ("method", "route", "status")
+
+latencia_http = Histograma(
+    "finapp_http_request_duration_seconds",
+    "Latencia de los requests HTTP por ruta",
+    BUCKETS_LATENCIA
+)
+
+consultas_por_request = Histograma(
+    "finapp_db_queries_per_request",
+    "Sentencias SQL ejecutadas por request",
+    BUCKETS_CONSULTAS
+)
+
+tiempo_db_por_request = Histograma(
+    "finapp_db_time_per_request_seconds",
+    "Tiempo en base de datos por request",
+    BUCKETS_LATENCIA
+)
+
+requests_totales = Contador(
+    "finapp_http_requests_total",
+    "Requests HTTP por ruta y estado"
+)
+
+ETIQUETAS_HASH = ("operacion",)
+
+latencia_hash = Histograma(
+    "finapp_password_hash_duration_seconds",
+    "Latencia de hash/verificación de contraseñas, incluida la espera en cola",
+    BUCKETS_LATENCIA
+)
+
+hash_pendientes = Medidor(
+    "finapp_password_hash_queue_depth",
+    "Operaciones de hash en cola o en ejecución en el pool de procesos"
+)
+
+hash_rechazados = Contador(
+    "finapp_password_hash_rejected_total",
+    "Operaciones de hash rechazadas por pool saturado"
+)
+
+
+# 🔹 Hooks de SQLAlchemy
+
+def instrumentar_sql(engine):
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metricas_inicio", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _despues(conn, cursor, statement, parameters, context, executemany):
+        inicio = conn.info["metricas_inicio"].pop()
+        actual = _request_actual.get()
+
+        if actual is not None:
+            actual["consultas"] += 1
+            actual["tiempo_db"] += time.perf_counter() - inicio
+
+
+# 🔹 Ciclo de vida del request
+
+def iniciar_request():
+
+    actual = {"consultas": 0, "tiempo_db": 0.0}
+    return actual, _request_actual.set(actual)
+
+
+def terminar_request(token, actual, metodo: str, ruta: str, estado: int, duracion: float):
+
+    _request_actual.reset(token)
+
+    requests_totales.incrementar((metodo, ruta, str(estado)))
+    latencia_http.observar((metodo, ruta), duracion)
+    consultas_por_request.observar((metodo, ruta), actual["consultas"])
+    tiempo_db_por_request.observar((metodo, ruta), actual["tiempo_db"])
+
+    return (
+        f'db;dur={actual["tiempo_db"] * 1000:.2f};desc="{actual["consultas"]} consultas", '
+        f"app;dur={duracion * 1000:.2f}"
+    )
+
+
+def exponer_prometheus():
+
+    lineas = []
+    lineas += requests_totales.exponer(ETIQUETAS_ESTADO)
+    lineas += latencia_http.exponer(ETIQUETAS_RUTA)
+    lineas += consultas_por_request.exponer(ETIQUETAS_RUTA)
+    lineas += tiempo_db_por_request.exponer(ETIQUETAS_RUTA)
+    lineas += latencia_hash.exponer(ETIQUETAS_HASH)
+    lineas += hash_pendientes.exponer()
+    lineas += hash_rechazados.exponer(ETIQUETAS_HASH)
+
+    return "\n".join(lineas) + "\n"
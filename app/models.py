@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Numeric, ForeignKey, DateTime, Boolean, Float, Enum
+from sqlalchemy import Column, Integer, String, Text, Numeric, ForeignKey, DateTime, Boolean, Float, Enum, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
@@ -54,6 +54,107 @@ class Movimiento(Base):
     usuario = relationship("Usuario")
     cuenta = relationship("Cuenta")
 
+    # 📊 Índices para reportes por periodo (filtros por rango de fecha)
+    __table_args__ = (
+        Index("ix_movimientos_usuario_fecha", "usuario_id", "fecha", "id"),
+        Index("ix_movimientos_usuario_tipo_fecha", "usuario_id", "tipo", "fecha"),
+        Index("ix_movimientos_usuario_categoria_fecha", "usuario_id", "categoria", "fecha"),
+        Index("ix_movimientos_cuenta_fecha", "cuenta_id", "fecha", "id"),
+        Index("ix_movimientos_transaccion", "transaccion_id"),
+    )
+
+class MovimientoResumenMensual(Base):
+    __tablename__ = "movimientos_resumen_mensual"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False)
+    cuenta_id = Column(Integer, ForeignKey("cuentas.id"), nullable=False)
+    anio = Column(Integer, nullable=False)
+    mes = Column(Integer, nullable=False)
+    tipo = Column(String, nullable=False)  # ingreso / gasto
+    categoria = Column(String, nullable=False)
+
+    total = Column(Numeric(14, 2), nullable=False, default=0)
+    cantidad = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "usuario_id", "cuenta_id", "anio", "mes", "tipo", "categoria",
+            name="uq_resumen_mensual_clave"
+        ),
+        Index("ix_resumen_mensual_usuario_periodo", "usuario_id", "anio", "mes"),
+    )
+
+class VersionUsuario(Base):
+    """Versión de los datos de un usuario: sube con cada escritura."""
+
+    __tablename__ = "versiones_usuario"
+
+    usuario_id = Column(Integer, ForeignKey("usuarios.id"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    actualizado_en = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class ClaveIdempotencia(Base):
+    """Primera respuesta de una escritura, por (usuario, Idempotency-Key)."""
+
+    __tablename__ = "claves_idempotencia"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False)
+    clave = Column(String(255), nullable=False)
+    # Hash de ruta + cuerpo: la misma clave con otro cuerpo se rechaza
+    huella = Column(String(64), nullable=False)
+
+    # Sin respuesta = la primera petición sigue en curso
+    estado_http = Column(Integer, nullable=True)
+    respuesta = Column(Text, nullable=True)
+
+    creado_en = Column(DateTime, nullable=False, default=datetime.utcnow)
+    expira_en = Column(DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        UniqueConstraint("usuario_id", "clave", name="uq_claves_idempotencia_usuario_clave"),
+    )
+
+class AsientoCuenta(Base):
+    """Libro de solo inserción: cada cambio de saldo/cupo de una cuenta."""
+
+    __tablename__ = "asientos_cuenta"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    cuenta_id = Column(Integer, ForeignKey("cuentas.id"), nullable=False)
+    # Sin FK: el asiento sobrevive al borrado del movimiento
+    movimiento_id = Column(Integer, nullable=True)
+
+    concepto = Column(String(20), nullable=False)  # apertura / movimiento / reverso / ajuste
+    delta = Column(Numeric(14, 2), nullable=False)
+
+    # Fecha efectiva (la del movimiento), no la de registro
+    fecha = Column(DateTime, nullable=False)
+    creado_en = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_asientos_cuenta_fecha", "cuenta_id", "fecha", "id"),
+    )
+
+class CorteSaldo(Base):
+    """Saldo acumulado de una cuenta con todos los asientos anteriores a `corte`."""
+
+    __tablename__ = "cortes_saldo"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    cuenta_id = Column(Integer, ForeignKey("cuentas.id"), nullable=False)
+    corte = Column(DateTime, nullable=False)
+    saldo = Column(Numeric(14, 2), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("cuenta_id", "corte", name="uq_cortes_saldo_cuenta_corte"),
+    )
+
 class Presupuesto(Base):
     __tablename__ = "presupuestos"
 
@@ -65,3 +166,55 @@ class Presupuesto(Base):
 
     usuario_id = Column(Integer, ForeignKey("usuarios.id"))
     usuario = relationship("Usuario")
+
+class AlertaPresupuestoMensual(Base):
+    """Presupuesto en ALERTA o EXCEDIDO según el job nocturno de alertas."""
+
+    __tablename__ = "alertas_presupuesto"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False)
+    presupuesto_id = Column(Integer, ForeignKey("presupuestos.id"), nullable=False)
+    anio = Column(Integer, nullable=False)
+    mes = Column(Integer, nullable=False)
+    categoria = Column(String, nullable=False)
+
+    limite = Column(Float, nullable=False)
+    gastado = Column(Numeric(14, 2), nullable=False)
+    porcentaje = Column(Float, nullable=False)
+    estado = Column(String(20), nullable=False)  # ALERTA / EXCEDIDO
+
+    generado_en = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("presupuesto_id", "anio", "mes", name="uq_alertas_presupuesto_periodo"),
+        Index("ix_alertas_presupuesto_usuario_periodo", "usuario_id", "anio", "mes"),
+    )
+
+class TramoAlertas(Base):
+    """Rango [desde_usuario, hasta_usuario) de una corrida del job de alertas."""
+
+    __tablename__ = "tramos_alertas"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Identificador de la corrida (por defecto la fecha UTC de ejecución)
+    corrida = Column(String(40), nullable=False)
+    anio = Column(Integer, nullable=False)
+    mes = Column(Integer, nullable=False)
+    desde_usuario = Column(Integer, nullable=False)
+    hasta_usuario = Column(Integer, nullable=False)
+
+    estado = Column(String(20), nullable=False, default="pendiente")  # pendiente / completo / error
+    presupuestos = Column(Integer, nullable=False, default=0)
+    alertas = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    actualizado_en = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "corrida", "anio", "mes", "desde_usuario",
+            name="uq_tramos_alertas_corrida_periodo_desde"
+        ),
+    )
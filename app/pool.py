@@ -0,0 +1,134 @@
+"""
+Pool de conexiones instrumentado.
+
+Mide cuánto espera cada checkout, cuántas conexiones hay prestadas y
+cuántas veces se entra en overflow, para ajustar workers frente a
+max_connections de Postgres.
+"""
+import time
+import threading
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+
+class EstadisticasPool:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.conexiones_creadas = 0
+        self.overflow_eventos = 0
+        self._en_overflow = False
+        self.timeouts = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+
+    def registrar_espera(self, segundos: float):
+
+        with self._lock:
+            self.checkouts += 1
+            self.espera_total += segundos
+            self.espera_max = max(self.espera_max, segundos)
+
+    def incrementar(self, contador: str):
+
+        with self._lock:
+            setattr(self, contador, getattr(self, contador) + 1)
+
+    def marcar_overflow(self, en_overflow: bool):
+        """Cuenta un evento solo al pasar de dentro de pool_size a overflow."""
+
+        with self._lock:
+            if en_overflow and not self._en_overflow:
+                self.overflow_eventos += 1
+
+            self._en_overflow = en_overflow
+
+    def resumen(self, pool):
+
+        with self._lock:
+            promedio = self.espera_total / self.checkouts if self.checkouts else 0
+
+            datos = {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "conexiones_creadas": self.conexiones_creadas,
+                "overflow_eventos": self.overflow_eventos,
+                "timeouts": self.timeouts,
+                "espera_promedio_ms": round(promedio * 1000, 3),
+                "espera_max_ms": round(self.espera_max * 1000, 3),
+            }
+
+        # Estado actual del pool (solo QueuePool expone tamaño/overflow)
+        if isinstance(pool, QueuePool):
+            datos.update({
+                "tamano": pool.size(),
+                "prestadas": pool.checkedout(),
+                "en_reposo": pool.checkedin(),
+                "overflow_actual": max(pool.overflow(), 0),
+            })
+
+        return datos
+
+
+class _MedirEspera:
+    """Mixin: cronometra la obtención de una conexión del pool."""
+
+    estadisticas = None
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+
+        try:
+            conexion = super()._do_get()
+        except exc.TimeoutError:
+            self.estadisticas.incrementar("timeouts")
+            raise
+
+        self.estadisticas.registrar_espera(time.perf_counter() - inicio)
+        return conexion
+
+
+def pool_medido(base):
+    """Subclase del pool indicado con sus propias estadísticas."""
+
+    return type(
+        f"{base.__name__}Medido",
+        (_MedirEspera, base),
+        {"estadisticas": EstadisticasPool()}
+    )
+
+
+def instrumentar(engine):
+    """Registra eventos de pool sobre un engine creado con pool_medido."""
+
+    estadisticas = engine.pool.estadisticas
+
+    @event.listens_for(engine, "connect")
+    def _conexion_creada(dbapi_connection, connection_record):
+        estadisticas.incrementar("conexiones_creadas")
+
+    # En overflow = más conexiones prestadas que pool_size
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        pool = engine.pool
+
+        if isinstance(pool, QueuePool):
+            estadisticas.marcar_overflow(pool.checkedout() > pool.size())
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        estadisticas.incrementar("checkins")
+        pool = engine.pool
+
+        # La conexión aún cuenta como prestada hasta volver a la cola
+        if isinstance(pool, QueuePool):
+            estadisticas.marcar_overflow(pool.checkedout() - 1 > pool.size())
+
+    return estadisticas
+
+
+QueuePoolMedido = pool_medido(QueuePool)
+AsyncQueuePoolMedido = pool_medido(AsyncAdaptedQueuePool)
@@ -0,0 +1,28 @@
+from decimal import Decimal
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+def _por_defecto(valor):
+
+    if isinstance(valor, Decimal):
+        return float(valor)
+
+    raise TypeError
+
+
+class RespuestaJSON(JSONResponse):
+    """
+    JSON serializado con orjson y charset declarado en el media type,
+    sin tener que reescribir el header en un middleware.
+    """
+
+    media_type = "application/json; charset=utf-8"
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(
+            content,
+            default=_por_defecto,
+            option=orjson.OPT_NON_STR_KEYS
+        )
@@ -1,10 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime, date, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from .. import models, schemas, database
 from ..auth import get_current_user
+from ..services.version_service import incrementar_version
+from ..services.libro_service import (
+    registrar_asiento, valor_cuenta, saldo_en_fecha, serie_saldos
+)
 
 router = APIRouter(prefix="/cuentas", tags=["Cuentas"])
 
+# Máximo de días por serie de saldos
+MAX_DIAS_SERIE = 731
+
 @router.post("/")
 def crear_cuenta(
     cuenta: schemas.CuentaCreate,
@@ -15,7 +23,7 @@ def crear_cuenta(
     if cuenta.tipo_cuenta == "credito":
         nueva_cuenta = models.Cuenta(
             usuario_id=current_user.id,
-            tipo=cuenta.tipo_cuenta,
+            tipo_cuenta=cuenta.tipo_cuenta,
             nombre=cuenta.nombre,
             saldo=None,
             cupo_total=cuenta.cupo_total,
@@ -24,7 +32,7 @@ def crear_cuenta(
     else:
         nueva_cuenta = models.Cuenta(
             usuario_id=current_user.id,
-            tipo=cuenta.tipo_cuenta,
+            tipo_cuenta=cuenta.tipo_cuenta,
             nombre=cuenta.nombre,
             saldo=cuenta.saldo,
             cupo_total=None,
@@ -32,8 +40,78 @@ def crear_cuenta(
         )
 
     db.add(nueva_cuenta)
+    db.flush()
+
+    # 📒 Apertura del libro con el saldo (o cupo) inicial
+    registrar_asiento(
+        db,
+        nueva_cuenta.id,
+        datetime.utcnow(),
+        valor_cuenta(nueva_cuenta),
+        concepto="apertura"
+    )
+    incrementar_version(db, current_user.id)
+
     db.commit()
     db.refresh(nueva_cuenta)
 
     return nueva_cuenta
 
+
+def _cuenta_del_usuario(db: Session, cuenta_id: int, usuario_id: int):
+
+    cuenta = db.query(models.Cuenta).filter(
+        models.Cuenta.id == cuenta_id,
+        models.Cuenta.usuario_id == usuario_id
+    ).first()
+
+    if not cuenta:
+        raise HTTPException(status_code=404, detail="Cuenta no encontrada")
+
+    return cuenta
+
+
+@router.get("/{cuenta_id}/saldo", response_model=schemas.SaldoEnFecha)
+def saldo_en_fecha_cuenta(
+    cuenta_id: int,
+    fecha: date | None = Query(None, description="Saldo al cierre de este día (por defecto hoy)"),
+    db: Session = Depends(database.get_db),
+    current_user: models.Usuario = Depends(get_current_user)
+):
+
+    cuenta = _cuenta_del_usuario(db, cuenta_id, current_user.id)
+    fecha = fecha or datetime.utcnow().date()
+
+    limite = datetime(fecha.year, fecha.month, fecha.day) + timedelta(days=1)
+
+    return {
+        "cuenta_id": cuenta.id,
+        "tipo_cuenta": cuenta.tipo_cuenta,
+        "fecha": fecha,
+        "saldo": saldo_en_fecha(db, cuenta.id, limite)
+    }
+
+
+@router.get("/{cuenta_id}/saldo/serie", response_model=schemas.SerieSaldos)
+def serie_saldo_cuenta(
+    cuenta_id: int,
+    desde: date = Query(...),
+    hasta: date | None = Query(None),
+    db: Session = Depends(database.get_db),
+    current_user: models.Usuario = Depends(get_current_user)
+):
+
+    cuenta = _cuenta_del_usuario(db, cuenta_id, current_user.id)
+    hasta = hasta or datetime.utcnow().date()
+
+    if hasta < desde:
+        raise HTTPException(status_code=400, detail="Rango de fechas inválido")
+
+    if (hasta - desde).days >= MAX_DIAS_SERIE:
+        raise HTTPException(status_code=400, detail=f"Máximo {MAX_DIAS_SERIE} días por serie")
+
+    return {
+        "cuenta_id": cuenta.id,
+        "tipo_cuenta": cuenta.tipo_cuenta,
+        "puntos": serie_saldos(db, cuenta.id, desde, hasta)
+    }
@@ -1,81 +1,67 @@
-from fastapi import APIRouter, Depends
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
+from sqlalchemy import func
 
-from app import models, database
+from app import models, schemas, database
 from app.auth import get_current_user
-from app.services.presupuesto_service import evaluar_presupuesto
+from app.etags import verificar_etag
+from app.services.presupuesto_service import evaluar_presupuestos
+from app.services.resumen_service import fuente_resumen
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
-@router.get("/")
+# Mes del año (1-12) en query params
+Mes = Annotated[int, Query(ge=1, le=12)]
+
+@router.get(
+    "/",
+    response_model=schemas.DashboardOut,
+    dependencies=[Depends(verificar_etag)]
+)
 def obtener_dashboard(
-    mes: int,
+    mes: Mes,
     anio: int,
     db: Session = Depends(database.get_db),
     current_user: models.Usuario = Depends(get_current_user)
 ):
 
-    # 🔹 Ingresos
-    ingresos = db.query(
-        func.coalesce(func.sum(models.Movimiento.monto), 0)
-    ).join(models.Cuenta).filter(
-        models.Cuenta.usuario_id == current_user.id,
-        models.Movimiento.tipo == "ingreso",
-        extract("month", models.Movimiento.fecha) == mes,
-        extract("year", models.Movimiento.fecha) == anio
-    ).scalar()
+    # 🔹 Totales del mes desde el resumen mensual (o movimientos si falta)
+    resumen = fuente_resumen(db, current_user.id, (anio, mes), (anio, mes))
+
+    filas = db.query(
+        resumen.tipo,
+        resumen.categoria,
+        func.sum(resumen.total).label("total")
+    ).filter(
+        resumen.usuario_id == current_user.id,
+        resumen.anio == anio,
+        resumen.mes == mes
+    ).group_by(
+        resumen.tipo,
+        resumen.categoria
+    ).all()
 
-    # 🔹 Gastos
-    gastos = db.query(
-        func.coalesce(func.sum(models.Movimiento.monto), 0)
-    ).join(models.Cuenta).filter(
-        models.Cuenta.usuario_id == current_user.id,
-        models.Movimiento.tipo == "gasto",
-        extract("month", models.Movimiento.fecha) == mes,
-        extract("year", models.Movimiento.fecha) == anio
-    ).scalar()
+    ingresos = sum(f.total for f in filas if f.tipo == "ingreso")
+    gastos = sum(f.total for f in filas if f.tipo == "gasto")
 
     balance = ingresos - gastos
 
     # 🔹 Gastos por categoría
-    categorias = db.query(
-        models.Movimiento.categoria,
-        func.coalesce(func.sum(models.Movimiento.monto), 0).label("total")
-    ).join(models.Cuenta).filter(
-        models.Cuenta.usuario_id == current_user.id,
-        models.Movimiento.tipo == "gasto",
-        extract("month", models.Movimiento.fecha) == mes,
-        extract("year", models.Movimiento.fecha) == anio
-    ).group_by(models.Movimiento.categoria).all()
-
     categorias_lista = [
         {
-            "categoria": c.categoria,
-            "total": float(c.total)
+            "categoria": f.categoria,
+            "total": float(f.total)
         }
-        for c in categorias
+        for f in filas if f.tipo == "gasto"
     ]
 
-    # 🔹 Presupuestos en alerta
-    presupuestos = db.query(models.Presupuesto).filter(
-        models.Presupuesto.usuario_id == current_user.id,
-        models.Presupuesto.mes == mes,
-        models.Presupuesto.anio == anio
-    ).all()
-
-    alertas = 0
-
-    for p in presupuestos:
-        resultado = evaluar_presupuesto(
-            db=db,
-            usuario_id=current_user.id,
-            categoria=p.categoria,
-            mes=mes,
-            anio=anio
-        )
-        if resultado:
-            alertas += 1
+    # 🔹 Presupuestos en alerta (una sola consulta agrupada)
+    alertas = sum(
+        1 for p in evaluar_presupuestos(db, current_user.id, mes, anio)
+        if p["alerta"]
+    )
 
     return {
         "ingresos": float(ingresos),
@@ -0,0 +1,55 @@
+import hmac
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+from app.config import INTERNAL_TOKEN
+from app.auth import cache_usuarios
+from app import database
+from app.services import hash_service
+from app.services.cache_respuestas import cache_respuestas
+
+
+def verificar_interno(x_interno_token: str | None = Header(None)):
+
+    # Sin INTERNAL_TOKEN configurado los endpoints internos no existen
+    if not INTERNAL_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    if not x_interno_token or not hmac.compare_digest(x_interno_token, INTERNAL_TOKEN):
+        raise HTTPException(status_code=403, detail="Acceso restringido")
+
+
+router = APIRouter(
+    prefix="/interno",
+    tags=["Interno"],
+    dependencies=[Depends(verificar_interno)]
+)
+
+
+@router.get("/cache/usuarios")
+def estadisticas_cache_usuarios():
+    return cache_usuarios.estadisticas()
+
+
+@router.get("/cache/respuestas")
+def estadisticas_cache_respuestas():
+    return cache_respuestas.estadisticas()
+
+
+@router.get("/pool")
+def estadisticas_pool():
+
+    datos = {
+        "sync": database.estadisticas_pool.resumen(database.engine.pool)
+    }
+
+    if database.async_engine is not None:
+        pool = database.async_engine.sync_engine.pool
+        datos["async"] = pool.estadisticas.resumen(pool)
+
+    return datos
+
+
+@router.get("/hash")
+def estadisticas_hash():
+    return hash_service.estadisticas()
@@ -3,21 +3,41 @@ from sqlalchemy.orm import Session
 from .. import models, schemas, database
 from ..auth import get_current_user
 from decimal import Decimal
-from sqlalchemy import func, extract
-from app.services.presupuesto_service import evaluar_presupuesto
+from sqlalchemy import func
+from app.services.presupuesto_service import evaluar_presupuesto, evaluar_presupuestos
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
-from fastapi import Query
-from collections import defaultdict
-import re
+from fastapi import Query, Request
+import json
+from itertools import islice
 from app.database import get_db
 from app.services.finanzas_service import parsear_movimiento
-from datetime import datetime
+from app.services.clasificador import clasificar
+from app.services.periodos import filtro_periodo, cubetas
+from app.services.resumen_service import sumar_movimiento, restar_movimiento, fuente_resumen
+from app.services.saldos_service import aplicar_delta, efecto, motivo_rechazo
+from app.services.libro_service import asentar_movimiento
+from app.services.version_service import incrementar_version
+from app.services.cache_respuestas import cache_por_version
+from app.etags import verificar_etag
+from app.services.idempotencia_service import idempotente
+from app.services.paginacion import paginar
+from app.services.movimientos_service import listar_agrupados, serie_flujo
+from app.services.comparativo_service import comparar_categorias, alertas_comparativo
+from app.services.importacion_service import importar_movimientos
+from app.services.exportacion_service import exportar_movimientos
+from datetime import datetime, date
+from typing import Annotated
+from fastapi.responses import StreamingResponse
 
 router = APIRouter(prefix="/movimientos", tags=["Movimientos"])
 
+# Mes del año (1-12) en query params
+Mes = Annotated[int, Query(ge=1, le=12)]
+
 
 @router.post("/")
+@idempotente
 def crear_movimiento(
     movimiento: schemas.MovimientoCreate,
     db: Session = Depends(database.get_db),
@@ -25,52 +45,25 @@ def crear_movimiento(
 ):
 
     try:
-        # 🔹 Buscar cuenta del usuario
-        cuenta = db.query(models.Cuenta).filter(
-            models.Cuenta.id == movimiento.cuenta_id,
-            models.Cuenta.usuario_id == current_user.id
-        ).first()
-
-        if not cuenta:
-            raise HTTPException(status_code=404, detail="Cuenta no encontrada")
-
         monto = Decimal(movimiento.monto)
 
-        # 🔥 LÓGICA FINANCIERA
-        if cuenta.tipo_cuenta == "credito":
-
-            if movimiento.tipo == "gasto":
-
-                if cuenta.cupo_disponible < monto:
-                    raise HTTPException(status_code=400, detail="Cupo insuficiente")
-
-                cuenta.cupo_disponible -= monto
-
-            elif movimiento.tipo == "ingreso":
-                # Pago a tarjeta
-                cuenta.cupo_disponible += monto
-
-                if cuenta.cupo_disponible > cuenta.cupo_total:
-                    cuenta.cupo_disponible = cuenta.cupo_total
-
-
-        else:  # débito, ahorro, inversión
-
-            if movimiento.tipo == "gasto":
-
-                if cuenta.saldo < monto:
-                    raise HTTPException(status_code=400, detail="Saldo insuficiente")
-
-                cuenta.saldo = Decimal(cuenta.saldo) - monto
-
-            elif movimiento.tipo == "ingreso":
-                cuenta.saldo = Decimal(cuenta.saldo) + monto
+        # 🔥 LÓGICA FINANCIERA: un UPDATE condicional sobre la cuenta
+        # del usuario (saldo, o cupo si es crédito, recortado a cupo_total)
+        cuenta = aplicar_delta(
+            db,
+            movimiento.cuenta_id,
+            efecto(movimiento.tipo, monto),
+            usuario_id=current_user.id
+        )
 
+        if cuenta is None:
+            estado, detalle = motivo_rechazo(db, movimiento.cuenta_id, current_user.id)
+            raise HTTPException(status_code=estado, detail=detalle)
 
         # 🔹 Crear movimiento
         nuevo_movimiento = models.Movimiento(
             usuario_id=current_user.id,
-            cuenta_id=cuenta.id,
+            cuenta_id=movimiento.cuenta_id,
             tipo=movimiento.tipo,
             monto=monto,
             descripcion=movimiento.descripcion or "Sin descripción",
@@ -78,8 +71,10 @@ def crear_movimiento(
             transaccion_id = movimiento.transaccion_id or None  # 🔥 nuevo
         )
 
-        db.add(cuenta)
         db.add(nuevo_movimiento)
+        sumar_movimiento(db, nuevo_movimiento)
+        asentar_movimiento(db, nuevo_movimiento, cuenta=cuenta)
+        incrementar_version(db, current_user.id)
         db.commit()
         db.refresh(nuevo_movimiento)
 
@@ -109,12 +104,116 @@ def crear_movimiento(
             "alerta": alerta
         }
 
+    except HTTPException:
+        db.rollback()
+        raise
+
     except Exception as e:
         db.rollback()
         print("ERROR REAL:", e)
         raise HTTPException(status_code=500, detail=str(e))
     
 
+MAX_REGISTROS_BULK = 10000
+MAX_BYTES_BULK = 10 * 1024 * 1024
+
+
+def _demasiado_grande():
+    return HTTPException(
+        status_code=413,
+        detail=f"Máximo {MAX_BYTES_BULK // (1024 * 1024)} MB por carga"
+    )
+
+
+async def _leer_bloques(request: Request):
+    """Bloques del cuerpo, cortando apenas se pasa de MAX_BYTES_BULK."""
+
+    largo = request.headers.get("content-length", "")
+
+    if largo.isdigit() and int(largo) > MAX_BYTES_BULK:
+        raise _demasiado_grande()
+
+    leidos = 0
+
+    async for bloque in request.stream():
+        leidos += len(bloque)
+
+        if leidos > MAX_BYTES_BULK:
+            raise _demasiado_grande()
+
+        yield bloque
+
+
+async def leer_registros(request: Request):
+    """
+    Lee el cuerpo como arreglo JSON o como NDJSON (una línea por registro).
+    El NDJSON se procesa línea a línea a medida que llega. En ambos casos
+    se corta en MAX_BYTES_BULK, antes de parsear todo el cuerpo.
+    """
+
+    tipo_contenido = request.headers.get("content-type", "")
+    registros = []
+
+    if "ndjson" in tipo_contenido:
+        pendiente = b""
+
+        async for bloque in _leer_bloques(request):
+            pendiente += bloque
+            *lineas, pendiente = pendiente.split(b"\n")
+            registros.extend(_parsear_linea(l) for l in lineas if l.strip())
+
+            if len(registros) > MAX_REGISTROS_BULK:
+                break
+
+        if pendiente.strip():
+            registros.append(_parsear_linea(pendiente))
+
+    else:
+        cuerpo = b"".join([bloque async for bloque in _leer_bloques(request)])
+
+        try:
+            registros = json.loads(cuerpo)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="JSON inválido")
+
+        if not isinstance(registros, list):
+            raise HTTPException(status_code=400, detail="Se esperaba un arreglo de movimientos")
+
+    if len(registros) > MAX_REGISTROS_BULK:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Máximo {MAX_REGISTROS_BULK} movimientos por carga"
+        )
+
+    return registros
+
+
+def _parsear_linea(linea: bytes):
+
+    try:
+        return json.loads(linea)
+    except ValueError:
+        # Se reporta como error de la fila al validar
+        return None
+
+
+@router.post("/bulk")
+def crear_movimientos_bulk(
+    # El usuario va primero: las dependencias se resuelven en orden y
+    # el cuerpo solo se lee con un token válido
+    current_user: models.Usuario = Depends(get_current_user),
+    db: Session = Depends(database.get_db),
+    registros: list = Depends(leer_registros)
+):
+
+    try:
+        return importar_movimientos(db, current_user.id, registros)
+
+    except SQLAlchemyError:
+        db.rollback()
+        raise HTTPException(status_code=500, detail="Error al importar movimientos")
+
+
 @router.delete("/{movimiento_id}")
 def eliminar_movimiento(
     movimiento_id: int,
@@ -130,23 +229,17 @@ def eliminar_movimiento(
     if not movimiento:
         raise HTTPException(status_code=404, detail="Movimiento no encontrado")
 
-    cuenta = movimiento.cuenta
-    monto = movimiento.monto
-
-    # 🔁 REVERTIR EFECTO FINANCIERO
-    if cuenta.tipo_cuenta == "credito":
-
-        if movimiento.tipo == "gasto":
-            cuenta.cupo_disponible += monto
-        else:
-            cuenta.cupo_disponible -= monto
-
-    else:
-        if movimiento.tipo == "gasto":
-            cuenta.saldo += monto
-        else:
-            cuenta.saldo -= monto
+    # 🔁 REVERTIR EFECTO FINANCIERO (sin validar: borrar siempre se permite)
+    cuenta = aplicar_delta(
+        db,
+        movimiento.cuenta_id,
+        -efecto(movimiento.tipo, movimiento.monto),
+        validar=False
+    )
 
+    restar_movimiento(db, movimiento)
+    asentar_movimiento(db, movimiento, signo=-1, cuenta=cuenta)
+    incrementar_version(db, current_user.id)
     db.delete(movimiento)
     db.commit()
 
@@ -169,125 +262,78 @@ def editar_movimiento(
     if not movimiento:
         raise HTTPException(status_code=404, detail="Movimiento no encontrado")
 
-    cuenta = movimiento.cuenta
+    # 🔁 Efecto neto (revertir el anterior + aplicar el nuevo) en un UPDATE
+    nuevo_monto = Decimal(datos.monto)
+    delta = efecto(datos.tipo, nuevo_monto) - efecto(movimiento.tipo, movimiento.monto)
 
-    # 🔁 1. Revertir efecto anterior
-    monto_anterior = movimiento.monto
+    cuenta = aplicar_delta(db, movimiento.cuenta_id, delta)
 
-    if cuenta.tipo_cuenta == "credito":
-        if movimiento.tipo == "gasto":
-            cuenta.cupo_disponible += monto_anterior
-        else:
-            cuenta.cupo_disponible -= monto_anterior
-    else:
-        if movimiento.tipo == "gasto":
-            cuenta.saldo += monto_anterior
-        else:
-            cuenta.saldo -= monto_anterior
+    if cuenta is None:
+        _, detalle = motivo_rechazo(db, movimiento.cuenta_id)
+        raise HTTPException(status_code=400, detail=detalle)
 
-    # 🔥 2. Aplicar nuevo efecto
-    nuevo_monto = Decimal(datos.monto)
+    # 🔄 Actualizar campos (y el resumen mensual)
+    restar_movimiento(db, movimiento)
+    asentar_movimiento(db, movimiento, signo=-1)
 
-    if cuenta.tipo_cuenta == "credito":
-        if datos.tipo == "gasto":
-            cuenta.cupo_disponible -= nuevo_monto
-        else:
-            cuenta.cupo_disponible += nuevo_monto
-    else:
-        if datos.tipo == "gasto":
-            cuenta.saldo -= nuevo_monto
-        else:
-            cuenta.saldo += nuevo_monto
-
-    # 🔄 Actualizar campos
     movimiento.tipo = datos.tipo
     movimiento.monto = nuevo_monto
     movimiento.descripcion = datos.descripcion
     movimiento.categoria = datos.categoria
 
+    sumar_movimiento(db, movimiento)
+    asentar_movimiento(db, movimiento, cuenta=cuenta)
+    incrementar_version(db, current_user.id)
+
     db.commit()
 
     return {"mensaje": "Movimiento actualizado correctamente"}
 
 
-@router.get("/")
+@router.get(
+    "/",
+    response_model=schemas.PaginaMovimientos,
+    response_model_exclude_unset=True,
+    dependencies=[Depends(verificar_etag)]
+)
 def obtener_todos_movimientos(
     agrupar: bool = Query(False),
+    limit: int = Query(100, ge=1, le=500),
+    after: str | None = Query(None),
     db: Session = Depends(database.get_db),
     current_user: models.Usuario = Depends(get_current_user)
 ):
 
-    movimientos = db.query(models.Movimiento)\
-        .filter(models.Movimiento.usuario_id == current_user.id)\
-        .order_by(models.Movimiento.fecha.desc())\
-        .all()
-
-    # 🔹 Si no se quiere agrupar
-    if not agrupar:
-        return movimientos
-
-    # 🔥 Agrupar por transaccion_id
-    agrupados = defaultdict(list)
-
-    for m in movimientos:
-        key = m.transaccion_id if m.transaccion_id else f"single-{m.id}"
-        agrupados[key].append(m)
-
-    resultado = []
-
-    for key, grupo in agrupados.items():
-
-        # 🔹 Movimiento normal
-        if grupo[0].transaccion_id is None:
-            m = grupo[0]
-            resultado.append({
-                "id": m.id,
-                "tipo": m.tipo,
-                "monto": float(m.monto),
-                "categoria": m.categoria,
-                "descripcion": m.descripcion,
-                "fecha": m.fecha
-            })
+    try:
+        # 🔥 Agrupar transferencias (una sola consulta con cuentas)
+        if agrupar:
+            items, next_cursor = listar_agrupados(
+                db, current_user.id, limit, after
+            )
 
-        # 🔥 Transferencia
+        # 🔹 Si no se quiere agrupar
         else:
-            salida = next((m for m in grupo if m.tipo == "gasto"), None)
-            entrada = next((m for m in grupo if m.tipo == "ingreso"), None)
-
-            if salida and salida.usuario_id == current_user.id:
-                tipo_transferencia = "transferencia_enviada"
-                monto = -float(salida.monto)
-                descripcion = f"Enviado a {entrada.cuenta.nombre}" if entrada else "Transferencia enviada"
-
-            elif entrada and entrada.usuario_id == current_user.id:
-                tipo_transferencia = "transferencia_recibida"
-                monto = float(entrada.monto)
-                descripcion = f"Recibido de {salida.cuenta.nombre}" if salida else "Transferencia recibida"
-
-            else:
-                tipo_transferencia = "transferencia"
-                monto = float(grupo[0].monto)
-                descripcion = "Transferencia"
+            query = db.query(models.Movimiento)\
+                .filter(models.Movimiento.usuario_id == current_user.id)
 
-            resultado.append({
-                "transaccion_id": key,
-                "tipo": tipo_transferencia,
-                "monto": monto,
-                "descripcion": descripcion,
-                "cuenta_origen": salida.cuenta.nombre if salida else None,
-                "cuenta_destino": entrada.cuenta.nombre if entrada else None,
-                "fecha": grupo[0].fecha
-            })
+            items, next_cursor = paginar(query, models.Movimiento, limit, after)
 
-    resultado.sort(key=lambda x: x["fecha"], reverse=True)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
 
-    return resultado
+    return {"items": items, "next_cursor": next_cursor}
 
 
 
-@router.get("/cuenta/{cuenta_id}")
+@router.get(
+    "/cuenta/{cuenta_id}",
+    response_model=schemas.PaginaMovimientos,
+    dependencies=[Depends(verificar_etag)]
+)
 def obtener_movimientos(
     cuenta_id: int,
+    limit: int = Query(100, ge=1, le=500),
+    after: str | None = Query(None),
     db: Session = Depends(database.get_db),
     current_user: models.Usuario = Depends(get_current_user)
 ):
@@ -299,13 +345,101 @@ def obtener_movimientos(
     if not cuenta:
         raise HTTPException(status_code=404, detail="Cuenta no encontrada")
 
-    movimientos = db.query(models.Movimiento).filter(
+    query = db.query(models.Movimiento).filter(
         models.Movimiento.cuenta_id == cuenta_id
-    ).order_by(models.Movimiento.fecha.desc()).all()
+    )
+
+    try:
+        movimientos, next_cursor = paginar(query, models.Movimiento, limit, after)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+    return {"items": movimientos, "next_cursor": next_cursor}
+
+@router.get("/export")
+def exportar(
+    formato: str = Query("csv", pattern="^(csv|ndjson)$"),
+    desde: date | None = Query(None),
+    hasta: date | None = Query(None),
+    cuenta_id: int | None = Query(None),
+    agrupar: bool = Query(False),
+    db: Session = Depends(database.get_db),
+    current_user: models.Usuario = Depends(get_current_user)
+):
 
-    return movimientos
+    if cuenta_id is not None:
+        cuenta = db.query(models.Cuenta).filter(
+            models.Cuenta.id == cuenta_id,
+            models.Cuenta.usuario_id == current_user.id
+        ).first()
+
+        if not cuenta:
+            raise HTTPException(status_code=404, detail="Cuenta no encontrada")
 
-@router.get("/resumen")
+    media_type = "text/csv; charset=utf-8" if formato == "csv" else "application/x-ndjson; charset=utf-8"
+
+    return StreamingResponse(
+        exportar_movimientos(
+            current_user.id,
+            formato=formato,
+            desde=desde,
+            hasta=hasta,
+            cuenta_id=cuenta_id,
+            agrupar=agrupar
+        ),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="movimientos.{formato}"'
+        }
+    )
+
+# Máximo de cubetas por serie
+MAX_CUBETAS_SERIE = 1000
+
+# Máximo de meses en los comparativos por categoría
+MAX_PERIODOS_COMPARATIVO = 24
+
+@router.get(
+    "/serie",
+    response_model=schemas.SerieFlujo,
+    dependencies=[Depends(verificar_etag)]
+)
+def serie_movimientos(
+    desde: date,
+    hasta: date,
+    granularidad: str = Query("mes", pattern="^(dia|semana|mes)$"),
+    cuenta_id: int | None = Query(None),
+    db: Session = Depends(database.get_db),
+    current_user: models.Usuario = Depends(get_current_user)
+):
+
+    if hasta < desde:
+        raise HTTPException(status_code=400, detail="Rango de fechas inválido")
+
+    if len(list(islice(cubetas(desde, hasta, granularidad), MAX_CUBETAS_SERIE + 1))) > MAX_CUBETAS_SERIE:
+        raise HTTPException(status_code=400, detail=f"Máximo {MAX_CUBETAS_SERIE} periodos por serie")
+
+    if cuenta_id is not None:
+        cuenta = db.query(models.Cuenta.id).filter(
+            models.Cuenta.id == cuenta_id,
+            models.Cuenta.usuario_id == current_user.id
+        ).first()
+
+        if not cuenta:
+            raise HTTPException(status_code=404, detail="Cuenta no encontrada")
+
+    return {
+        "granularidad": granularidad,
+        "desde": desde,
+        "hasta": hasta,
+        "puntos": serie_flujo(db, current_user.id, desde, hasta, granularidad, cuenta_id)
+    }
+
+@router.get(
+    "/resumen",
+    response_model=schemas.ResumenFinanciero,
+    dependencies=[Depends(verificar_etag)]
+)
 def resumen_financiero(
     db: Session = Depends(database.get_db),
     current_user: models.Usuario = Depends(get_current_user)
@@ -338,30 +472,30 @@ def resumen_financiero(
         "total_cuentas": total_cuentas
     }
 
-@router.get("/resumen-mensual")
+@router.get(
+    "/resumen-mensual",
+    response_model=schemas.ResumenMensual,
+    dependencies=[Depends(verificar_etag)]
+)
 def resumen_mensual(
     anio: int,
-    mes: int,
+    mes: Mes,
     db: Session = Depends(database.get_db),
     current_user: models.Usuario = Depends(get_current_user)
 ):
 
     ingresos = db.query(func.coalesce(func.sum(models.Movimiento.monto), 0))\
-        .join(models.Cuenta)\
         .filter(
-            models.Cuenta.usuario_id == current_user.id,
+            models.Movimiento.usuario_id == current_user.id,
             models.Movimiento.tipo == "ingreso",
-            extract("year", models.Movimiento.fecha) == anio,
-            extract("month", models.Movimiento.fecha) == mes
+            *filtro_periodo(models.Movimiento.fecha, anio, mes)
         ).scalar()
 
     gastos = db.query(func.coalesce(func.sum(models.Movimiento.monto), 0))\
-        .join(models.Cuenta)\
         .filter(
-            models.Cuenta.usuario_id == current_user.id,
+            models.Movimiento.usuario_id == current_user.id,
             models.Movimiento.tipo == "gasto",
-            extract("year", models.Movimiento.fecha) == anio,
-            extract("month", models.Movimiento.fecha) == mes
+            *filtro_periodo(models.Movimiento.fecha, anio, mes)
         ).scalar()
 
     return {
@@ -372,24 +506,34 @@ def resumen_mensual(
         "balance": ingresos - gastos
     }
 
-@router.get("/comparativo-anual")
+@router.get(
+    "/comparativo-anual",
+    response_model=list[schemas.ComparativoMes],
+    dependencies=[Depends(verificar_etag)]
+)
+@cache_por_version("comparativo-anual")
 def comparativo_anual(
     anio: int,
     db: Session = Depends(database.get_db),
     current_user: models.Usuario = Depends(get_current_user)
 ):
 
+    # Resumen mensual (con respaldo en movimientos si faltan meses)
+    resumen = fuente_resumen(db, current_user.id, (anio, 1), (anio, 12))
+
     resultados = db.query(
-        extract("month", models.Movimiento.fecha).label("mes"),
-        models.Movimiento.tipo,
-        func.coalesce(func.sum(models.Movimiento.monto), 0).label("total")
+        resumen.mes,
+        resumen.tipo,
+        func.coalesce(func.sum(resumen.total), 0).label("total")
     )\
-    .join(models.Cuenta)\
     .filter(
-        models.Cuenta.usuario_id == current_user.id,
-        extract("year", models.Movimiento.fecha) == anio
+        resumen.usuario_id == current_user.id,
+        resumen.anio == anio
+    )\
+    .group_by(
+        resumen.mes,
+        resumen.tipo
     )\
-    .group_by("mes", models.Movimiento.tipo)\
     .all()
 
     # 🔥 Crear estructura base con los 12 meses
@@ -421,23 +565,30 @@ def comparativo_anual(
     # 🔥 Retornar lista ordenada
     return list(resumen.values())
 
-@router.get("/estadisticas-categorias")
+@router.get(
+    "/estadisticas-categorias",
+    response_model=list[schemas.EstadisticaCategoria],
+    dependencies=[Depends(verificar_etag)]
+)
+@cache_por_version("estadisticas-categorias")
 def estadisticas_categorias(
     db: Session = Depends(database.get_db),
     current_user: models.Usuario = Depends(get_current_user)
 ):
 
+    # Resumen mensual (con respaldo en movimientos si faltan meses)
+    resumen = fuente_resumen(db, current_user.id)
+
     resultados = db.query(
-        models.Movimiento.categoria,
-        func.coalesce(func.sum(models.Movimiento.monto), 0).label("total")
+        resumen.categoria,
+        func.coalesce(func.sum(resumen.total), 0).label("total")
     )\
-    .join(models.Cuenta)\
     .filter(
-        models.Cuenta.usuario_id == current_user.id,
-        models.Movimiento.tipo == "gasto"
+        resumen.usuario_id == current_user.id,
+        resumen.tipo == "gasto"
     )\
-    .group_by(models.Movimiento.categoria)\
-    .order_by(func.sum(models.Movimiento.monto).desc())\
+    .group_by(resumen.categoria)\
+    .order_by(func.sum(resumen.total).desc())\
     .all()
 
     total_general = sum(r.total for r in resultados)
@@ -455,160 +606,46 @@ def estadisticas_categorias(
 
     return estadisticas
 
-@router.get("/comparativo-categoria")
+@router.get(
+    "/comparativo-categoria",
+    response_model=list[schemas.ComparativoCategoria],
+    dependencies=[Depends(verificar_etag)]
+)
+@cache_por_version("comparativo-categoria")
 def comparativo_categoria(
     anio: int,
-    mes_actual: int,
+    mes_actual: Mes,
+    periodos: int = Query(2, ge=2, le=MAX_PERIODOS_COMPARATIVO),
     db: Session = Depends(database.get_db),
     current_user: models.Usuario = Depends(get_current_user)
 ):
 
-    # Calcular mes anterior
-    if mes_actual == 1:
-        mes_anterior = 12
-        anio_anterior = anio - 1
-    else:
-        mes_anterior = mes_actual - 1
-        anio_anterior = anio
+    return comparar_categorias(db, current_user.id, anio, mes_actual, periodos)
 
-    # Consulta mes actual
-    actual = db.query(
-        models.Movimiento.categoria,
-        func.coalesce(func.sum(models.Movimiento.monto), 0).label("total")
-    )\
-    .join(models.Cuenta)\
-    .filter(
-        models.Cuenta.usuario_id == current_user.id,
-        models.Movimiento.tipo == "gasto",
-        extract("year", models.Movimiento.fecha) == anio,
-        extract("month", models.Movimiento.fecha) == mes_actual
-    )\
-    .group_by(models.Movimiento.categoria)\
-    .all()
-
-    # Consulta mes anterior
-    anterior = db.query(
-        models.Movimiento.categoria,
-        func.coalesce(func.sum(models.Movimiento.monto), 0).label("total")
-    )\
-    .join(models.Cuenta)\
-    .filter(
-        models.Cuenta.usuario_id == current_user.id,
-        models.Movimiento.tipo == "gasto",
-        extract("year", models.Movimiento.fecha) == anio_anterior,
-        extract("month", models.Movimiento.fecha) == mes_anterior
-    )\
-    .group_by(models.Movimiento.categoria)\
-    .all()
-
-    # Convertir a diccionarios
-    actual_dict = {a.categoria: a.total for a in actual}
-    anterior_dict = {a.categoria: a.total for a in anterior}
-
-    # Unir categorías
-    categorias = set(actual_dict.keys()) | set(anterior_dict.keys())
-
-    resultado = []
-
-    for categoria in categorias:
-        total_actual = actual_dict.get(categoria, 0)
-        total_anterior = anterior_dict.get(categoria, 0)
-
-    if total_anterior > 0:
-        variacion = ((total_actual - total_anterior) / total_anterior) * 100
-    else:
-        variacion = None
-
-        resultado.append({
-            "categoria": categoria,
-            "mes_actual": total_actual,
-            "mes_anterior": total_anterior,
-            "diferencia": total_actual - total_anterior,
-            "variacion_porcentual": round(variacion, 2) if variacion is not None else None
-        })
-
-    return resultado
-
-@router.get("/alertas-categorias")
+@router.get(
+    "/alertas-categorias",
+    response_model=list[schemas.AlertaCategoria],
+    dependencies=[Depends(verificar_etag)]
+)
 def alertas_categorias(
     anio: int,
-    mes_actual: int,
+    mes_actual: Mes,
     umbral: float = 20,
+    periodos: int = Query(2, ge=2, le=MAX_PERIODOS_COMPARATIVO),
     db: Session = Depends(database.get_db),
     current_user: models.Usuario = Depends(get_current_user)
 ):
 
-    # Calcular mes anterior
-    if mes_actual == 1:
-        mes_anterior = 12
-        anio_anterior = anio - 1
-    else:
-        mes_anterior = mes_actual - 1
-        anio_anterior = anio
+    comparativo = comparar_categorias(db, current_user.id, anio, mes_actual, periodos)
 
-    # Mes actual
-    actual = db.query(
-        models.Movimiento.categoria,
-        func.coalesce(func.sum(models.Movimiento.monto), 0).label("total")
-    )\
-    .join(models.Cuenta)\
-    .filter(
-        models.Cuenta.usuario_id == current_user.id,
-        models.Movimiento.tipo == "gasto",
-        extract("year", models.Movimiento.fecha) == anio,
-        extract("month", models.Movimiento.fecha) == mes_actual
-    )\
-    .group_by(models.Movimiento.categoria)\
-    .all()
+    return alertas_comparativo(comparativo, umbral)
 
-    # Mes anterior
-    anterior = db.query(
-        models.Movimiento.categoria,
-        func.coalesce(func.sum(models.Movimiento.monto), 0).label("total")
-    )\
-    .join(models.Cuenta)\
-    .filter(
-        models.Cuenta.usuario_id == current_user.id,
-        models.Movimiento.tipo == "gasto",
-        extract("year", models.Movimiento.fecha) == anio_anterior,
-        extract("month", models.Movimiento.fecha) == mes_anterior
-    )\
-    .group_by(models.Movimiento.categoria)\
-    .all()
-
-    actual_dict = {a.categoria: a.total for a in actual}
-    anterior_dict = {a.categoria: a.total for a in anterior}
-
-    categorias = set(actual_dict.keys()) | set(anterior_dict.keys())
-
-    alertas = []
-
-    for categoria in categorias:
-        total_actual = actual_dict.get(categoria, 0)
-        total_anterior = anterior_dict.get(categoria, 0)
-
-        # 🔥 Caso 1: Nuevo gasto
-        if total_actual > 0 and total_anterior == 0:
-            alertas.append({
-                "categoria": categoria,
-                "tipo_alerta": "nuevo_gasto",
-                "variacion_porcentual": None
-            })
-            continue
-
-        # 🔥 Caso 2: Aumento significativo
-        if total_anterior > 0:
-            variacion = ((total_actual - total_anterior) / total_anterior) * 100
-            if variacion > umbral:
-                alertas.append({
-                    "categoria": categoria,
-                    "tipo_alerta": "aumento_significativo",
-                    "variacion_porcentual": round(variacion, 2)
-                })
-
-    return alertas
-
-@router.get("/presupuesto-sugerido")
+@router.get(
+    "/presupuesto-sugerido",
+    response_model=list[schemas.PresupuestoSugerido],
+    dependencies=[Depends(verificar_etag)]
+)
+@cache_por_version("presupuesto-sugerido")
 def presupuesto_sugerido(
     anio: int,
     margen: float = 10,  # % adicional opcional
@@ -616,18 +653,23 @@ def presupuesto_sugerido(
     current_user: models.Usuario = Depends(get_current_user)
 ):
 
+    # Resumen mensual (con respaldo en movimientos si faltan meses)
+    resumen = fuente_resumen(db, current_user.id, (anio, 1), (anio, 12))
+
     resultados = db.query(
-        models.Movimiento.categoria,
-        extract("month", models.Movimiento.fecha).label("mes"),
-        func.coalesce(func.sum(models.Movimiento.monto), 0).label("total")
+        resumen.categoria,
+        resumen.mes,
+        func.coalesce(func.sum(resumen.total), 0).label("total")
     )\
-    .join(models.Cuenta)\
     .filter(
-        models.Cuenta.usuario_id == current_user.id,
-        models.Movimiento.tipo == "gasto",
-        extract("year", models.Movimiento.fecha) == anio
+        resumen.usuario_id == current_user.id,
+        resumen.tipo == "gasto",
+        resumen.anio == anio
+    )\
+    .group_by(
+        resumen.categoria,
+        resumen.mes
     )\
-    .group_by(models.Movimiento.categoria, "mes")\
     .all()
 
     # Organizar datos por categoría
@@ -643,7 +685,7 @@ def presupuesto_sugerido(
     for categoria, valores in categorias.items():
         promedio = sum(valores) / len(valores)
 
-        sugerido = promedio * (1 + margen / 100)
+        sugerido = promedio * (1 + Decimal(str(margen)) / 100)
 
         presupuesto.append({
             "categoria": categoria,
@@ -657,7 +699,7 @@ def presupuesto_sugerido(
 def crear_presupuesto(
     categoria: str,
     monto_limite: float,
-    mes: int,
+    mes: Mes,
     anio: int,
     db: Session = Depends(database.get_db),
     current_user: models.Usuario = Depends(get_current_user)
@@ -672,56 +714,33 @@ def crear_presupuesto(
     )
 
     db.add(nuevo)
+    incrementar_version(db, current_user.id)
     db.commit()
 
     return {"mensaje": "Presupuesto creado"}
 
-@router.get("/presupuestos/alertas")
+@router.get(
+    "/presupuestos/alertas",
+    response_model=list[schemas.AlertaPresupuesto],
+    dependencies=[Depends(verificar_etag)]
+)
 def revisar_alertas(
-    mes: int,
+    mes: Mes,
     anio: int,
     db: Session = Depends(database.get_db),
     current_user: models.Usuario = Depends(get_current_user)
 ):
 
-    presupuestos = db.query(models.Presupuesto).filter(
-        models.Presupuesto.usuario_id == current_user.id,
-        models.Presupuesto.mes == mes,
-        models.Presupuesto.anio == anio
-    ).all()
-
-    alertas = []
-
-    for p in presupuestos:
-
-        gasto_actual = db.query(
-            func.coalesce(func.sum(models.Movimiento.monto), 0)
-        )\
-        .join(models.Cuenta)\
-        .filter(
-            models.Cuenta.usuario_id == current_user.id,
-            models.Movimiento.tipo == "gasto",
-            models.Movimiento.categoria == p.categoria,
-            extract("month", models.Movimiento.fecha) == mes,
-            extract("year", models.Movimiento.fecha) == anio
-        ).scalar()
-
-        porcentaje = (gasto_actual / p.monto_limite) * 100 if p.monto_limite > 0 else 0
-
-        estado = "OK"
-
-        if porcentaje >= 100:
-            estado = "EXCEDIDO"
-        elif porcentaje >= 80:
-            estado = "ALERTA"
-
-        alertas.append({
-            "categoria": p.categoria,
-            "limite": p.monto_limite,
-            "gastado": gasto_actual,
-            "porcentaje": round(porcentaje, 2),
-            "estado": estado
-        })
+    alertas = [
+        {
+            "categoria": p["categoria"],
+            "limite": p["limite"],
+            "gastado": p["gastado"],
+            "porcentaje": p["porcentaje"],
+            "estado": p["estado"]
+        }
+        for p in evaluar_presupuestos(db, current_user.id, mes, anio)
+    ]
 
     return alertas
 
@@ -731,57 +750,16 @@ def registrar_texto(
     db: Session = Depends(get_db),
     current_user: models.Usuario = Depends(get_current_user)
 ):
-    texto = data.texto.lower()
-
-    # =========================
-    # 🔥 detectar tipo
-    # =========================
-    ingreso_keywords = ["ingreso", "salario", "pago", "me pagaron", "gané", "recibí"]
-    tipo = "ingreso" if any(k in texto for k in ingreso_keywords) else "gasto"
-
-    # =========================
-    # 🔥 extraer monto
-    # =========================
-    match = re.search(r'\d+[.,]?\d*', texto)
+    # 🔥 tipo, monto, categoría y descripción en una sola pasada
+    resultado = clasificar(data.texto)
 
-    if not match:
+    if resultado["monto"] is None:
         raise HTTPException(status_code=400, detail="No se detectó monto")
 
-    monto = float(match.group().replace(",", "").replace(".", ""))
-
-    # =========================
-    # 🔥 inferir categoría
-    # =========================
-    if any(p in texto for p in ["comida", "restaurante", "frutas", "almuerzo", "mercado"]):
-        categoria = "Comida"
-    elif any(p in texto for p in ["uber", "bus", "taxi", "transporte"]):
-        categoria = "Transporte"
-    elif any(p in texto for p in ["arriendo", "luz", "agua", "internet"]):
-        categoria = "Hogar"
-    elif any(p in texto for p in ["salario", "pago", "ingreso"]):
-        categoria = "Ingreso"
-    else:
-        categoria = "General"
-
-    # =========================
-    # 🔥 limpiar descripción
-    # =========================
-    descripcion = texto.lower()
-
-    # quitar monto 
-    descripcion = re.sub(r"\$?\s?\d[\d\.,]*", "", descripcion)
-
-    # quitar palabras basura 
-    basura = ["por", "de", "del", "la", "el", "los", "las"] 
-    for b in basura: 
-        descripcion = re.sub(rf"\b{b}\b", "", descripcion)
-
-    # limpiar espacios 
-    descripcion = re.sub(r"\s+", " ", descripcion).strip()
-
-    descripcion = texto.replace(match.group(), "").strip()
-
-    descripcion = descripcion.capitalize()
+    tipo = resultado["tipo"]
+    monto = resultado["monto"]
+    categoria = resultado["categoria"]
+    descripcion = resultado["descripcion"]
 
     # =========================
     # 🔥 obtener cuenta del usuario
@@ -796,17 +774,37 @@ def registrar_texto(
     # =========================
     # 🔥 crear movimiento
     # =========================
+    # El clasificador devuelve float: se pasa por str para no arrastrar
+    # el error binario al saldo
+    monto_exacto = Decimal(str(monto))
+
     movimiento = models.Movimiento(
         usuario_id=current_user.id,
         cuenta_id=cuenta.id,
         tipo=tipo,
-        monto=monto,
+        monto=monto_exacto,
         descripcion=descripcion,
         categoria=categoria,
         fecha=datetime.utcnow()
     )
 
+    # 🔥 Saldo/cupo con el mismo UPDATE condicional que crear_movimiento
+    actualizada = aplicar_delta(
+        db,
+        cuenta.id,
+        efecto(tipo, monto_exacto),
+        usuario_id=current_user.id
+    )
+
+    if actualizada is None:
+        db.rollback()
+        estado, detalle = motivo_rechazo(db, cuenta.id, current_user.id)
+        raise HTTPException(status_code=estado, detail=detalle)
+
     db.add(movimiento)
+    sumar_movimiento(db, movimiento)
+    asentar_movimiento(db, movimiento, cuenta=actualizada)
+    incrementar_version(db, current_user.id)
     db.commit()
 
     return {
@@ -822,3 +820,7 @@ def analizar_texto(payload: dict):
     texto = payload.get("texto")
     return parsear_movimiento(texto)
 
+@router.post("/analizar-texto/batch")
+def analizar_texto_batch(payload: schemas.TextosLote):
+    return [parsear_movimiento(texto) for texto in payload.textos]
+
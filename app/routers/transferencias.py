@@ -6,6 +6,12 @@ from decimal import Decimal
 
 from app import models, schemas, database
 from ..auth import get_current_user
+from app.services.resumen_service import sumar_movimiento
+from app.services.saldos_service import aplicar_delta
+from app.services.libro_service import asentar_movimiento
+from app.services.version_service import incrementar_version
+from app.services.transferencias_service import transferir_lote, TransferenciaRechazada
+from app.services.idempotencia_service import idempotente
 
 
 router = APIRouter(
@@ -14,7 +20,28 @@ router = APIRouter(
 )
 
 
+def mover_fondos(db: Session, origen_id: int, destino_id: int, monto: Decimal):
+    """
+    Débito condicional en origen y abono en destino, un UPDATE cada uno,
+    en orden de id para que transferencias cruzadas no se bloqueen.
+    Devuelve las filas actualizadas por id, o None si el origen no tiene
+    saldo (quien llama hace rollback).
+    """
+
+    deltas = {origen_id: -monto, destino_id: monto}
+    cuentas = {}
+
+    for cuenta_id in sorted(deltas):
+        cuentas[cuenta_id] = aplicar_delta(db, cuenta_id, deltas[cuenta_id])
+
+        if cuentas[cuenta_id] is None:
+            return None
+
+    return cuentas
+
+
 @router.post("/")
+@idempotente
 def crear_transferencia(
     transferencia: schemas.TransferenciaCreate,
     db: Session = Depends(database.get_db),
@@ -55,29 +82,24 @@ def crear_transferencia(
             )
 
         # 🚫 No permitir transferir desde crédito
-        if cuenta_origen.tipo == "credito":
+        if cuenta_origen.tipo_cuenta == "credito":
             raise HTTPException(
                 status_code=400,
                 detail="No puedes transferir desde una cuenta crédito"
             )
 
-        # 💰 Validar saldo suficiente
-        if cuenta_origen.saldo < monto:
+        # 🔥 Aplicar cambios financieros (valida saldo en el mismo UPDATE)
+        actualizadas = mover_fondos(db, cuenta_origen.id, cuenta_destino.id, monto)
+
+        if actualizadas is None:
+            db.rollback()
             raise HTTPException(
                 status_code=400,
                 detail="Saldo insuficiente"
             )
 
-        # 🔥 Aplicar cambios financieros
-        cuenta_origen.saldo -= monto
-
-        if cuenta_destino.tipo == "credito":
-            cuenta_destino.cupo_disponible += monto
-
-            if cuenta_destino.cupo_disponible > cuenta_destino.cupo_total:
-                cuenta_destino.cupo_disponible = cuenta_destino.cupo_total
-        else:
-            cuenta_destino.saldo += monto
+        # 🆔 ID único de transacción (agrupa ambas patas)
+        transaction_id = str(uuid4())
 
         # 🧾 Crear doble movimiento contable
         movimiento_salida = models.Movimiento(
@@ -86,7 +108,8 @@ def crear_transferencia(
             tipo="gasto",
             monto=monto,
             categoria="transferencia",
-            descripcion=transferencia.descripcion or "Transferencia enviada"
+            descripcion=transferencia.descripcion or "Transferencia enviada",
+            transaccion_id=transaction_id
         )
 
         movimiento_entrada = models.Movimiento(
@@ -95,15 +118,17 @@ def crear_transferencia(
             tipo="ingreso",
             monto=monto,
             categoria="transferencia",
-            descripcion=transferencia.descripcion or "Transferencia recibida"
+            descripcion=transferencia.descripcion or "Transferencia recibida",
+            transaccion_id=transaction_id
         )
 
-        db.add_all([
-            cuenta_origen,
-            cuenta_destino,
-            movimiento_salida,
-            movimiento_entrada
-        ])
+        db.add_all([movimiento_salida, movimiento_entrada])
+
+        sumar_movimiento(db, movimiento_salida)
+        sumar_movimiento(db, movimiento_entrada)
+        asentar_movimiento(db, movimiento_salida)
+        asentar_movimiento(db, movimiento_entrada, cuenta=actualizadas[cuenta_destino.id])
+        incrementar_version(db, current_user.id)
 
         db.commit()
 
@@ -123,6 +148,7 @@ def crear_transferencia(
 
 
 @router.post("/entre-usuarios")
+@idempotente
 def transferir_entre_usuarios(
     transferencia: schemas.TransferenciaUsuarioCreate,
     db: Session = Depends(database.get_db),
@@ -168,30 +194,22 @@ def transferir_entre_usuarios(
             )
 
         # 🚫 No permitir transferir desde crédito
-        if cuenta_origen.tipo == "credito":
+        if cuenta_origen.tipo_cuenta == "credito":
             raise HTTPException(
                 status_code=400,
                 detail="No puedes transferir desde una cuenta crédito"
             )
 
-        # 💰 Validar saldo suficiente
-        if cuenta_origen.saldo < monto:
+        # 🔥 Aplicar cambios financieros (valida saldo en el mismo UPDATE)
+        actualizadas = mover_fondos(db, cuenta_origen.id, cuenta_destino.id, monto)
+
+        if actualizadas is None:
+            db.rollback()
             raise HTTPException(
                 status_code=400,
                 detail="Saldo insuficiente"
             )
 
-        # 🔥 Aplicar cambios financieros
-        cuenta_origen.saldo -= monto
-
-        if cuenta_destino.tipo == "credito":
-            cuenta_destino.cupo_disponible += monto
-
-            if cuenta_destino.cupo_disponible > cuenta_destino.cupo_total:
-                cuenta_destino.cupo_disponible = cuenta_destino.cupo_total
-        else:
-            cuenta_destino.saldo += monto
-
         # 🆔 ID único de transacción
         transaction_id = str(uuid4())
 
@@ -203,7 +221,7 @@ def transferir_entre_usuarios(
             monto=monto,
             categoria="transferencia",
             descripcion=transferencia.descripcion or "Transferencia enviada",
-            transaction_id=transaction_id
+            transaccion_id=transaction_id
         )
 
         # 🧾 Movimiento entrada (usuario destino)
@@ -214,15 +232,19 @@ def transferir_entre_usuarios(
             monto=monto,
             categoria="transferencia",
             descripcion=transferencia.descripcion or "Transferencia recibida",
-            transaction_id=transaction_id
+            transaccion_id=transaction_id
         )
 
-        db.add_all([
-            cuenta_origen,
-            cuenta_destino,
-            movimiento_salida,
-            movimiento_entrada
-        ])
+        db.add_all([movimiento_salida, movimiento_entrada])
+
+        sumar_movimiento(db, movimiento_salida)
+        sumar_movimiento(db, movimiento_entrada)
+        asentar_movimiento(db, movimiento_salida)
+        asentar_movimiento(db, movimiento_entrada, cuenta=actualizadas[cuenta_destino.id])
+        incrementar_version(db, current_user.id)
+
+        if cuenta_destino.usuario_id != current_user.id:
+            incrementar_version(db, cuenta_destino.usuario_id)
 
         db.commit()
 
@@ -239,4 +261,27 @@ def transferir_entre_usuarios(
         raise HTTPException(
             status_code=500,
             detail="Error al procesar la transferencia"
-        )
\ No newline at end of file
+        )
+
+
+@router.post("/batch")
+@idempotente
+def transferir_lote_endpoint(
+    lote: schemas.TransferenciasLote,
+    db: Session = Depends(database.get_db),
+    current_user: models.Usuario = Depends(get_current_user)
+):
+
+    try:
+        return transferir_lote(db, current_user.id, lote.transferencias)
+
+    except TransferenciaRechazada as e:
+        db.rollback()
+        raise HTTPException(status_code=e.estado, detail=e.detalle)
+
+    except SQLAlchemyError:
+        db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail="Error al procesar las transferencias"
+        )
@@ -1,46 +1,99 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from .. import models, schemas, database, auth
-from ..auth import verify_password, create_access_token
+from .. import models, schemas, database
+from ..auth import create_access_token, claims_usuario
+from ..services.hash_service import (
+    hash_password_async, verificar_password_async, HashSaturado
+)
 from fastapi.security import OAuth2PasswordRequestForm
 
 router = APIRouter(prefix="/usuarios", tags=["Usuarios"])
 
-@router.post("/registro")
-def registrar(usuario: schemas.UsuarioCreate, db: Session = Depends(database.get_db)):
-    hashed = auth.hash_password(usuario.password)
+
+# 🔑 Los endpoints son async: el hash corre en el pool de procesos y la
+# base de datos se usa con database.en_sesion (Session o AsyncSession).
+
+async def _hash_o_503(coro):
+
+    try:
+        return await coro
+    except HashSaturado:
+        raise HTTPException(
+            status_code=503,
+            detail="Servicio ocupado, intenta de nuevo",
+            headers={"Retry-After": "1"}
+        )
+
+
+def _guardar_usuario(db: Session, nombre: str, email: str, password_hash: str):
 
     nuevo_usuario = models.Usuario(
-        nombre=usuario.nombre,
-        email=usuario.email,
-        password_hash=hashed
+        nombre=nombre,
+        email=email,
+        password_hash=password_hash
     )
 
     db.add(nuevo_usuario)
     db.commit()
-    db.refresh(nuevo_usuario)
+
+
+def _buscar_por_email(db: Session, email: str):
+
+    usuario = db.query(models.Usuario).filter(
+        models.Usuario.email == email
+    ).first()
+
+    if usuario is None:
+        return None
+
+    return usuario.id, usuario.password_hash, claims_usuario(usuario)
+
+
+def _actualizar_hash(db: Session, usuario_id: int, password_hash: str):
+
+    db.query(models.Usuario)\
+        .filter(models.Usuario.id == usuario_id)\
+        .update({"password_hash": password_hash}, synchronize_session=False)
+    db.commit()
+
+
+@router.post("/registro")
+async def registrar(usuario: schemas.UsuarioCreate, db: Session = Depends(database.get_db)):
+    hashed = await _hash_o_503(hash_password_async(usuario.password))
+
+    await database.en_sesion(
+        db, _guardar_usuario, usuario.nombre, usuario.email, hashed
+    )
 
     return {"mensaje": "Usuario creado correctamente"}
 
 @router.post("/login")
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(database.get_db)
 ):
 
-    usuario = db.query(models.Usuario).filter(
-        models.Usuario.email == form_data.username
-    ).first()
+    encontrado = await database.en_sesion(db, _buscar_por_email, form_data.username)
 
-    if not usuario:
+    if not encontrado:
         raise HTTPException(status_code=400, detail="Usuario no existe")
 
-    if not verify_password(form_data.password, usuario.password_hash):
+    usuario_id, password_hash, claims = encontrado
+
+    valida, nuevo_hash = await _hash_o_503(
+        verificar_password_async(form_data.password, password_hash)
+    )
+
+    if not valida:
         raise HTTPException(status_code=400, detail="Contraseña incorrecta")
 
-    token = create_access_token({"sub": str(usuario.id)})
+    # 🔄 Hash con rounds viejos: se guarda el recalculado
+    if nuevo_hash:
+        await database.en_sesion(db, _actualizar_hash, usuario_id, nuevo_hash)
+
+    token = create_access_token(claims)
 
     return {
         "access_token": token,
         "token_type": "bearer"
-    }
\ No newline at end of file
+    }
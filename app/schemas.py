@@ -1,6 +1,7 @@
-from pydantic import BaseModel, model_validator, Field
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, model_validator, Field
+from typing import Optional, Union
 from decimal import Decimal
+from datetime import datetime, date, timezone
 
 class UsuarioCreate(BaseModel):
     nombre: str
@@ -57,6 +58,19 @@ class MovimientoCreate(BaseModel):
     # 🔥 Nuevo (opcional)
     transaccion_id: Optional[str] = None
 
+class MovimientoImportar(MovimientoCreate):
+    # 🔥 Para cargas históricas (por defecto: ahora)
+    fecha: Optional[datetime] = None
+
+    @model_validator(mode="after")
+    def fecha_utc(self):
+
+        # Las fechas se guardan en UTC sin zona (como datetime.utcnow)
+        if self.fecha is not None and self.fecha.tzinfo is not None:
+            self.fecha = self.fecha.astimezone(timezone.utc).replace(tzinfo=None)
+
+        return self
+
 class TransferenciaCreate(BaseModel):
     cuenta_origen_id: int
     cuenta_destino_id: int
@@ -69,5 +83,142 @@ class TransferenciaUsuarioCreate(BaseModel):
     monto: Decimal
     descripcion: str | None = None
 
+class TransferenciasLote(BaseModel):
+    transferencias: list[TransferenciaUsuarioCreate] = Field(min_length=1, max_length=500)
+
 class TextoMovimiento(BaseModel):
     texto: str
+
+class TextosLote(BaseModel):
+    textos: list[str] = Field(max_length=1000)
+
+
+# =========================
+# 📤 Respuestas
+# =========================
+
+class MovimientoOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    usuario_id: int
+    cuenta_id: int
+    tipo: str
+    monto: float
+    categoria: str
+    descripcion: Optional[str] = None
+    transaccion_id: Optional[str] = None
+    fecha: Optional[datetime] = None
+
+class MovimientoAgrupado(BaseModel):
+    # Movimiento normal (id, categoria) o transferencia (transaccion_id, cuentas)
+    id: Optional[int] = None
+    transaccion_id: Optional[str] = None
+    tipo: str
+    monto: float
+    categoria: Optional[str] = None
+    descripcion: Optional[str] = None
+    cuenta_origen: Optional[str] = None
+    cuenta_destino: Optional[str] = None
+    fecha: Optional[datetime] = None
+
+class PaginaMovimientos(BaseModel):
+    items: list[Union[MovimientoOut, MovimientoAgrupado]]
+    next_cursor: Optional[str] = None
+
+class CategoriaTotal(BaseModel):
+    categoria: str
+    total: float
+
+class DashboardOut(BaseModel):
+    ingresos: float
+    gastos: float
+    balance: float
+    presupuestos_alerta: int
+    categorias: list[CategoriaTotal]
+
+class ResumenFinanciero(BaseModel):
+    total_ingresos: float
+    total_gastos: float
+    balance_actual: float
+    total_cuentas: int
+
+class ResumenMensual(BaseModel):
+    anio: int
+    mes: int
+    ingresos: float
+    gastos: float
+    balance: float
+
+class ComparativoMes(BaseModel):
+    mes: int
+    ingresos: float
+    gastos: float
+    balance: float
+
+class PuntoSerie(BaseModel):
+    periodo: date
+    ingresos: float
+    gastos: float
+    neto: float
+    # Neto de todos los movimientos hasta el cierre del periodo
+    acumulado: float
+
+class SerieFlujo(BaseModel):
+    granularidad: str
+    desde: date
+    hasta: date
+    puntos: list[PuntoSerie]
+
+class EstadisticaCategoria(BaseModel):
+    categoria: str
+    total: float
+    porcentaje: float
+
+class TotalPeriodo(BaseModel):
+    anio: int
+    mes: int
+    total: float
+    diferencia: Optional[float] = None
+    variacion_porcentual: Optional[float] = None
+
+class ComparativoCategoria(BaseModel):
+    categoria: str
+    mes_actual: float
+    mes_anterior: float
+    diferencia: float
+    variacion_porcentual: Optional[float] = None
+    promedio_anterior: float
+    periodos: list[TotalPeriodo]
+
+class AlertaCategoria(BaseModel):
+    categoria: str
+    tipo_alerta: str
+    variacion_porcentual: Optional[float] = None
+
+class PresupuestoSugerido(BaseModel):
+    categoria: str
+    promedio_mensual: float
+    presupuesto_sugerido: float
+
+class AlertaPresupuesto(BaseModel):
+    categoria: str
+    limite: float
+    gastado: float
+    porcentaje: float
+    estado: str
+
+class PuntoSaldo(BaseModel):
+    fecha: date
+    saldo: float
+
+class SaldoEnFecha(BaseModel):
+    cuenta_id: int
+    tipo_cuenta: str
+    fecha: date
+    saldo: float
+
+class SerieSaldos(BaseModel):
+    cuenta_id: int
+    tipo_cuenta: str
+    puntos: list[PuntoSaldo]
@@ -0,0 +1,163 @@
+"""
+Job nocturno de alertas de presupuesto para todos los usuarios.
+
+Parte los usuarios en tramos por rango de id y evalúa cada tramo en un
+pool de procesos; cada worker abre su propio engine (las conexiones no
+se comparten entre procesos). Las alertas quedan en alertas_presupuesto
+y el avance en tramos_alertas, por corrida. La corrida es por defecto la
+fecha UTC del día, así cada noche se reevalúa todo; si falla, relanzar
+el mismo día (o con la misma --corrida) retoma solo los tramos
+pendientes o con error.
+
+Uso:
+    python -m app.scripts.alertas_presupuestos
+    python -m app.scripts.alertas_presupuestos --anio 2025 --mes 3 --workers 8 --tramo 500
+    python -m app.scripts.alertas_presupuestos --corrida 2025-03-14
+    python -m app.scripts.alertas_presupuestos --reiniciar
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.config import DATABASE_URL
+from app.database import Base, engine, SessionLocal
+from app.services.alertas_presupuesto_service import planificar_tramos, procesar_tramo
+
+# Sesiones del worker (una por proceso, creada en _iniciar_worker)
+_SesionWorker = None
+
+
+def _iniciar_worker(url: str):
+    global _SesionWorker
+
+    # El engine heredado del proceso padre no se usa en el worker
+    engine.dispose(close=False)
+
+    _SesionWorker = sessionmaker(
+        bind=create_engine(url, pool_size=1, max_overflow=0, pool_pre_ping=True),
+        autoflush=False
+    )
+
+
+def _ejecutar_tramo(tramo_id: int):
+
+    db = (_SesionWorker or SessionLocal)()
+    try:
+        return (tramo_id, *procesar_tramo(db, tramo_id))
+    finally:
+        db.close()
+
+
+def _reportar(hechos: int, total: int, inicio: float, detalle: str):
+
+    transcurrido = time.perf_counter() - inicio
+    print(
+        f"[{hechos}/{total}] {detalle} ({transcurrido:.1f}s)",
+        file=sys.stderr,
+        flush=True
+    )
+
+
+def main():
+
+    hoy = datetime.utcnow()
+
+    parser = argparse.ArgumentParser(
+        description="Evalúa todos los presupuestos del mes y guarda las alertas"
+    )
+    parser.add_argument("--anio", type=int, default=hoy.year)
+    parser.add_argument("--mes", type=int, default=hoy.month)
+    parser.add_argument(
+        "--corrida", default=hoy.date().isoformat(),
+        help="identificador de la corrida a crear o retomar (por defecto, hoy)"
+    )
+    parser.add_argument("--tramo", type=int, default=1000, help="usuarios por tramo (rango de id)")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1,
+        help="procesos; 0 = en el proceso actual"
+    )
+    parser.add_argument(
+        "--reiniciar", action="store_true",
+        help="vuelve a procesar también los tramos completos de la corrida"
+    )
+    args = parser.parse_args()
+
+    Base.metadata.create_all(
+        bind=engine,
+        tables=[models.AlertaPresupuestoMensual.__table__, models.TramoAlertas.__table__]
+    )
+
+    db = SessionLocal()
+    try:
+        tramos = planificar_tramos(
+            db, args.corrida, args.anio, args.mes, args.tramo, args.reiniciar
+        )
+    finally:
+        db.close()
+
+    total = len(tramos)
+    print(
+        f"Corrida {args.corrida}, tramos por procesar {args.anio}-{args.mes:02d}: {total}",
+        file=sys.stderr
+    )
+
+    inicio = time.perf_counter()
+    presupuestos = alertas = fallidos = 0
+
+    def registrar(hechos, resultado=None, tramo_id=None, error=None):
+        nonlocal presupuestos, alertas, fallidos
+
+        if error is not None:
+            fallidos += 1
+            _reportar(hechos, total, inicio, f"tramo {tramo_id}: ERROR {error!r}")
+            return
+
+        tramo_id, evaluados, generadas = resultado
+        presupuestos += evaluados
+        alertas += generadas
+        _reportar(
+            hechos, total, inicio,
+            f"tramo {tramo_id}: {evaluados} presupuestos, {generadas} alertas"
+        )
+
+    if args.workers <= 0:
+        for hechos, tramo_id in enumerate(tramos, start=1):
+            try:
+                registrar(hechos, _ejecutar_tramo(tramo_id))
+            except Exception as e:
+                registrar(hechos, tramo_id=tramo_id, error=e)
+    else:
+        # Las conexiones del padre no deben cruzar el fork
+        engine.dispose()
+
+        with ProcessPoolExecutor(
+            max_workers=args.workers,
+            initializer=_iniciar_worker,
+            initargs=(DATABASE_URL,)
+        ) as pool:
+            futuros = {pool.submit(_ejecutar_tramo, t): t for t in tramos}
+
+            for hechos, futuro in enumerate(as_completed(futuros), start=1):
+                try:
+                    registrar(hechos, futuro.result())
+                except Exception as e:
+                    registrar(hechos, tramo_id=futuros[futuro], error=e)
+
+    print(
+        f"Presupuestos: {presupuestos}, alertas: {alertas}, tramos con error: {fallidos}",
+        file=sys.stderr
+    )
+
+    if fallidos:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
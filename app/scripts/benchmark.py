@@ -0,0 +1,167 @@
+"""
+Benchmark en proceso de los endpoints principales.
+
+Llama a la app con TestClient (sin red) usando usuarios ya existentes
+(por ejemplo creados con app.scripts.generar_datos) y reporta latencia
+p50/p95/p99 y throughput por endpoint en JSON. La base es la de
+DATABASE_URL, así se compara SQLite contra un Postgres local.
+
+Uso:
+    python -m app.scripts.benchmark --iteraciones 200
+    python -m app.scripts.benchmark --concurrencia 8 --salida bench.json
+"""
+import argparse
+import json
+import math
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+from app import models
+from app.auth import create_access_token, claims_usuario
+from app.database import SessionLocal, engine
+from app.main import app
+
+
+def endpoints(usuario_id: int, anio: int, mes: int):
+
+    return {
+        "dashboard": f"/dashboard/?mes={mes}&anio={anio}",
+        "movimientos": "/movimientos/",
+        "movimientos_agrupados": "/movimientos/?agrupar=true",
+        "comparativo_anual": f"/movimientos/comparativo-anual?anio={anio}",
+        "estadisticas_categorias": "/movimientos/estadisticas-categorias",
+        "finanzas_dashboard": f"/finanzas/dashboard/{usuario_id}",
+    }
+
+
+def percentil(valores, p: float):
+    """Percentil por rango más cercano (valores ya ordenados)."""
+
+    if not valores:
+        return 0.0
+
+    indice = max(0, math.ceil(p / 100 * len(valores)) - 1)
+    return valores[indice]
+
+
+def tokens_de_usuarios(cantidad: int):
+
+    db = SessionLocal()
+    try:
+        usuarios = db.query(models.Usuario)\
+            .order_by(models.Usuario.id)\
+            .limit(cantidad)\
+            .all()
+
+        return [(u.id, create_access_token(claims_usuario(u))) for u in usuarios]
+    finally:
+        db.close()
+
+
+_local = threading.local()
+
+
+def cliente():
+    """Un TestClient por hilo."""
+
+    if not hasattr(_local, "cliente"):
+        _local.cliente = TestClient(app)
+
+    return _local.cliente
+
+
+def medir(url: str, sesiones, iteraciones: int, concurrencia: int):
+
+    def una_llamada(i):
+        usuario_id, token = sesiones[i % len(sesiones)]
+        ruta = url.format(usuario_id=usuario_id)
+
+        inicio = time.perf_counter()
+        respuesta = cliente().get(ruta, headers={"Authorization": f"Bearer {token}"})
+        duracion = time.perf_counter() - inicio
+
+        return duracion, respuesta.status_code
+
+    inicio_total = time.perf_counter()
+
+    if concurrencia > 1:
+        with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+            resultados = list(pool.map(una_llamada, range(iteraciones)))
+    else:
+        resultados = [una_llamada(i) for i in range(iteraciones)]
+
+    total = time.perf_counter() - inicio_total
+
+    latencias = sorted(d for d, _ in resultados)
+    errores = sum(1 for _, estado in resultados if estado >= 400)
+
+    return {
+        "iteraciones": iteraciones,
+        "errores": errores,
+        "p50_ms": round(percentil(latencias, 50) * 1000, 3),
+        "p95_ms": round(percentil(latencias, 95) * 1000, 3),
+        "p99_ms": round(percentil(latencias, 99) * 1000, 3),
+        "max_ms": round(latencias[-1] * 1000, 3) if latencias else 0,
+        "throughput_rps": round(iteraciones / total, 2) if total else 0,
+    }
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Benchmark de endpoints")
+    parser.add_argument("--iteraciones", type=int, default=100)
+    parser.add_argument("--concurrencia", type=int, default=1)
+    parser.add_argument("--usuarios", type=int, default=10,
+                        help="usuarios distintos entre los que se reparten las llamadas")
+    parser.add_argument("--calentamiento", type=int, default=5)
+    parser.add_argument("--solo", action="append", default=None,
+                        help="medir solo este endpoint (repetible)")
+    parser.add_argument("--anio", type=int, default=datetime.utcnow().year)
+    parser.add_argument("--mes", type=int, default=datetime.utcnow().month)
+    parser.add_argument("--salida", default=None, help="archivo JSON de salida")
+    args = parser.parse_args()
+
+    sesiones = tokens_de_usuarios(args.usuarios)
+
+    if not sesiones:
+        sys.exit("No hay usuarios: ejecutar antes app.scripts.generar_datos")
+
+    rutas = endpoints("{usuario_id}", args.anio, args.mes)
+
+    if args.solo:
+        rutas = {k: v for k, v in rutas.items() if k in args.solo}
+
+    resultado = {
+        "base_de_datos": engine.dialect.name,
+        "fecha": datetime.utcnow().isoformat(),
+        "parametros": {
+            "iteraciones": args.iteraciones,
+            "concurrencia": args.concurrencia,
+            "usuarios": len(sesiones),
+        },
+        "endpoints": {}
+    }
+
+    for nombre, url in rutas.items():
+        medir(url, sesiones, args.calentamiento, 1)
+        resultado["endpoints"][nombre] = medir(
+            url, sesiones, args.iteraciones, args.concurrencia
+        )
+        print(f"{nombre}: {resultado['endpoints'][nombre]}", file=sys.stderr)
+
+    salida = json.dumps(resultado, indent=2)
+
+    if args.salida:
+        with open(args.salida, "w") as f:
+            f.write(salida)
+    else:
+        print(salida)
+
+
+if __name__ == "__main__":
+    main()
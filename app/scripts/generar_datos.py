@@ -0,0 +1,297 @@
+"""
+Genera datos sintéticos realistas para pruebas de carga.
+
+Crea usuarios, cuentas de los cuatro tipos, presupuestos y movimientos
+(incluyendo pares de transferencia) a escala controlable. Usa la base
+configurada en DATABASE_URL (SQLite local o Postgres).
+
+Uso:
+    python -m app.scripts.generar_datos --usuarios 100 --movimientos 20000
+    python -m app.scripts.generar_datos --usuarios 50 --movimientos 40000 --meses 60 --semilla 7
+"""
+import argparse
+import random
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from faker import Faker
+from sqlalchemy import insert
+
+from app import models
+from app.auth import hash_password
+from app.database import Base, engine, SessionLocal
+from app.services.resumen_service import reconstruir_resumen
+from app.services.libro_service import reconstruir_libro
+
+PASSWORD_BENCH = "bench1234"
+
+CATEGORIAS_GASTO = {
+    "Alimentación": (8_000, 180_000),
+    "Transporte": (2_500, 60_000),
+    "Ocio": (10_000, 150_000),
+    "Salud": (15_000, 250_000),
+    "Recibos": (40_000, 300_000),
+    "Hogar": (20_000, 900_000),
+    "General": (5_000, 100_000),
+}
+
+CATEGORIAS_INGRESO = {
+    "Salario": (1_500_000, 8_000_000),
+    "Ingreso": (50_000, 900_000),
+}
+
+TIPOS_CUENTA = ["debito", "ahorro", "inversion", "credito"]
+
+
+def monto_aleatorio(rango, rnd: random.Random):
+    return Decimal(rnd.randint(*rango))
+
+
+def crear_usuarios(db, fake: Faker, cantidad: int):
+
+    password_hash = hash_password(PASSWORD_BENCH)
+
+    usuarios = [
+        models.Usuario(
+            nombre=fake.name(),
+            email=f"bench-{uuid.uuid4().hex[:12]}@{fake.free_email_domain()}",
+            password_hash=password_hash
+        )
+        for _ in range(cantidad)
+    ]
+
+    db.add_all(usuarios)
+    db.commit()
+
+    return usuarios
+
+
+def crear_cuentas(db, fake: Faker, usuarios, rnd: random.Random):
+
+    cuentas = []
+
+    for usuario in usuarios:
+        for tipo in TIPOS_CUENTA:
+
+            if tipo == "credito":
+                cupo = Decimal(rnd.choice([2, 5, 10, 20])) * 1_000_000
+                cuenta = models.Cuenta(
+                    usuario_id=usuario.id,
+                    tipo_cuenta=tipo,
+                    nombre=f"Tarjeta {fake.company()}"[:100],
+                    saldo=None,
+                    cupo_total=cupo,
+                    cupo_disponible=cupo
+                )
+            else:
+                cuenta = models.Cuenta(
+                    usuario_id=usuario.id,
+                    tipo_cuenta=tipo,
+                    nombre=f"{tipo.capitalize()} {fake.company()}"[:100],
+                    saldo=Decimal(rnd.randint(500_000, 20_000_000))
+                )
+
+            cuentas.append(cuenta)
+
+    db.add_all(cuentas)
+    db.commit()
+
+    return cuentas
+
+
+def crear_presupuestos(db, usuarios, meses: int, rnd: random.Random):
+
+    hoy = datetime.utcnow()
+    filas = []
+
+    for usuario in usuarios:
+        for atras in range(min(meses, 12)):
+            anio, mes = hoy.year, hoy.month - atras
+
+            while mes < 1:
+                mes += 12
+                anio -= 1
+
+            for categoria in rnd.sample(list(CATEGORIAS_GASTO), 3):
+                filas.append({
+                    "usuario_id": usuario.id,
+                    "categoria": categoria,
+                    "monto_limite": float(rnd.randint(200_000, 1_500_000)),
+                    "mes": mes,
+                    "anio": anio
+                })
+
+    if filas:
+        db.execute(insert(models.Presupuesto), filas)
+        db.commit()
+
+
+def crear_movimientos(
+    db,
+    fake: Faker,
+    cuentas,
+    por_usuario: int,
+    meses: int,
+    proporcion_transferencias: float,
+    lote: int,
+    rnd: random.Random
+):
+
+    cuentas_por_usuario = defaultdict(list)
+    for cuenta in cuentas:
+        cuentas_por_usuario[cuenta.usuario_id].append(cuenta)
+
+    hoy = datetime.utcnow()
+    inicio = hoy - timedelta(days=30 * meses)
+    segundos = int((hoy - inicio).total_seconds())
+
+    neto = defaultdict(Decimal)
+    pendientes = []
+    total = 0
+
+    def volcar():
+        nonlocal pendientes
+        if pendientes:
+            db.execute(insert(models.Movimiento), pendientes)
+            db.commit()
+            pendientes = []
+
+    for usuario_id, propias in cuentas_por_usuario.items():
+
+        liquidas = [c for c in propias if c.tipo_cuenta != "credito"]
+        creado = 0
+
+        while creado < por_usuario:
+            fecha = inicio + timedelta(seconds=rnd.randrange(segundos))
+
+            # 🔁 Par de transferencia (entre cuentas propias)
+            if rnd.random() < proporcion_transferencias and creado + 2 <= por_usuario:
+                origen = rnd.choice(liquidas)
+                destino = rnd.choice([c for c in propias if c.id != origen.id])
+                monto = monto_aleatorio((50_000, 2_000_000), rnd)
+                transaccion_id = str(uuid.uuid4())
+
+                for cuenta, tipo, descripcion in (
+                    (origen, "gasto", "Transferencia enviada"),
+                    (destino, "ingreso", "Transferencia recibida"),
+                ):
+                    pendientes.append({
+                        "usuario_id": usuario_id,
+                        "cuenta_id": cuenta.id,
+                        "tipo": tipo,
+                        "monto": monto,
+                        "categoria": "transferencia",
+                        "descripcion": descripcion,
+                        "transaccion_id": transaccion_id,
+                        "fecha": fecha
+                    })
+                    neto[cuenta.id] += monto if tipo == "ingreso" else -monto
+
+                creado += 2
+
+            else:
+                cuenta = rnd.choice(propias)
+
+                if rnd.random() < 0.15 and cuenta.tipo_cuenta != "credito":
+                    tipo = "ingreso"
+                    categoria = rnd.choice(list(CATEGORIAS_INGRESO))
+                    monto = monto_aleatorio(CATEGORIAS_INGRESO[categoria], rnd)
+                else:
+                    tipo = "gasto"
+                    categoria = rnd.choice(list(CATEGORIAS_GASTO))
+                    monto = monto_aleatorio(CATEGORIAS_GASTO[categoria], rnd)
+
+                pendientes.append({
+                    "usuario_id": usuario_id,
+                    "cuenta_id": cuenta.id,
+                    "tipo": tipo,
+                    "monto": monto,
+                    "categoria": categoria,
+                    "descripcion": fake.sentence(nb_words=4),
+                    "transaccion_id": None,
+                    "fecha": fecha
+                })
+                neto[cuenta.id] += monto if tipo == "ingreso" else -monto
+                creado += 1
+
+            if len(pendientes) >= lote:
+                total += len(pendientes)
+                volcar()
+                print(f"  ... {total} movimientos", flush=True)
+
+        total += len(pendientes)
+        volcar()
+
+    # 💰 Saldos coherentes con el historial generado
+    for cuenta in cuentas:
+        delta = neto.get(cuenta.id, Decimal(0))
+
+        if cuenta.tipo_cuenta == "credito":
+            cuenta.cupo_total = max(cuenta.cupo_total, -delta + 1_000_000)
+            cuenta.cupo_disponible = cuenta.cupo_total + min(delta, 0)
+        else:
+            cuenta.saldo = max(cuenta.saldo + delta, Decimal(0))
+
+    db.commit()
+
+    return total
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos")
+    parser.add_argument("--usuarios", type=int, default=10)
+    parser.add_argument("--movimientos", type=int, default=1000,
+                        help="movimientos por usuario")
+    parser.add_argument("--meses", type=int, default=24,
+                        help="meses de historial")
+    parser.add_argument("--transferencias", type=float, default=0.1,
+                        help="proporción de movimientos que son transferencias")
+    parser.add_argument("--lote", type=int, default=5000)
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.semilla)
+    fake = Faker("es_CO")
+    fake.seed_instance(args.semilla)
+
+    Base.metadata.create_all(bind=engine)
+
+    inicio = time.perf_counter()
+    db = SessionLocal()
+
+    try:
+        usuarios = crear_usuarios(db, fake, args.usuarios)
+        cuentas = crear_cuentas(db, fake, usuarios, rnd)
+        crear_presupuestos(db, usuarios, args.meses, rnd)
+
+        total = crear_movimientos(
+            db, fake, cuentas,
+            por_usuario=args.movimientos,
+            meses=args.meses,
+            proporcion_transferencias=args.transferencias,
+            lote=args.lote,
+            rnd=rnd
+        )
+
+        for usuario in usuarios:
+            reconstruir_resumen(db, usuario_id=usuario.id)
+
+        for cuenta in cuentas:
+            reconstruir_libro(db, cuenta_id=cuenta.id)
+
+    finally:
+        db.close()
+
+    print(
+        f"Listo: {args.usuarios} usuarios, {len(cuentas)} cuentas, "
+        f"{total} movimientos en {time.perf_counter() - inicio:.1f}s "
+        f"(password: {PASSWORD_BENCH})"
+    )
+
+
+if __name__ == "__main__":
+    main()
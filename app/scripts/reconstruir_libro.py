@@ -0,0 +1,46 @@
+"""
+Reconstruye el libro de asientos (y sus cortes) desde movimientos.
+
+Crea el libro de cuentas anteriores al libro o repara desvíos, y vuelve
+a calcular los cortes de saldo mensuales de cada cuenta.
+
+Correrlo una vez con --faltantes al desplegar el libro sobre una base
+con cuentas: hasta entonces el saldo en fecha de esas cuentas se calcula
+desde movimientos.
+
+Uso:
+    python -m app.scripts.reconstruir_libro
+    python -m app.scripts.reconstruir_libro --faltantes
+    python -m app.scripts.reconstruir_libro --cuenta-id 12
+"""
+import argparse
+
+from app.database import SessionLocal
+from app.services.libro_service import reconstruir_libro
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description="Recalcula el libro de asientos de las cuentas"
+    )
+    parser.add_argument("--cuenta-id", type=int, default=None)
+    parser.add_argument(
+        "--faltantes", action="store_true",
+        help="solo las cuentas sin asiento de apertura"
+    )
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        filas = reconstruir_libro(
+            db, cuenta_id=args.cuenta_id, solo_faltantes=args.faltantes
+        )
+    finally:
+        db.close()
+
+    print(f"Libro reconstruido: {filas} asientos")
+
+
+if __name__ == "__main__":
+    main()
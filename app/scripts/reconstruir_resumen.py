@@ -0,0 +1,38 @@
+"""
+Reconstruye la tabla movimientos_resumen_mensual desde movimientos.
+
+Correrlo una vez al desplegar el resumen mensual sobre una base con
+movimientos. Mientras tanto los reportes agregan desde movimientos los
+meses sin filas de resumen (fuente_resumen), pero un mes viejo que
+recibe un movimiento nuevo queda con resumen parcial hasta reconstruir.
+El job nocturno de alertas lee solo el resumen: correr esto antes.
+
+Uso:
+    python -m app.scripts.reconstruir_resumen
+    python -m app.scripts.reconstruir_resumen --usuario-id 7
+"""
+import argparse
+
+from app.database import SessionLocal
+from app.services.resumen_service import reconstruir_resumen
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description="Recalcula el resumen mensual de movimientos"
+    )
+    parser.add_argument("--usuario-id", type=int, default=None)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        filas = reconstruir_resumen(db, usuario_id=args.usuario_id)
+    finally:
+        db.close()
+
+    print(f"Resumen mensual reconstruido: {filas} filas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Reporte de patrimonio neto y endeudamiento de todos los usuarios.
+
+Recorre los usuarios por id en lotes y calcula cada lote con una sola
+consulta (dashboards_financieros). Escribe una línea JSON por usuario,
+con los montos como texto para no perder decimales.
+
+Uso:
+    python -m app.scripts.reporte_patrimonio
+    python -m app.scripts.reporte_patrimonio --lote 1000 --salida patrimonio.jsonl
+"""
+import argparse
+import json
+import sys
+
+from app import models
+from app.database import SessionLocal
+from app.services.finanzas_service import dashboards_financieros
+
+
+def lotes_usuarios(db, tamano: int):
+    """Ids de usuario en lotes ordenados, paginando por id."""
+
+    ultimo = 0
+
+    while True:
+        ids = [
+            fila.id for fila in db.query(models.Usuario.id)
+            .filter(models.Usuario.id > ultimo)
+            .order_by(models.Usuario.id)
+            .limit(tamano)
+            .all()
+        ]
+
+        if not ids:
+            return
+
+        yield ids
+        ultimo = ids[-1]
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description="Patrimonio neto y ratio de endeudamiento por usuario"
+    )
+    parser.add_argument("--lote", type=int, default=500)
+    parser.add_argument("--salida", default=None)
+    args = parser.parse_args()
+
+    salida = open(args.salida, "w", encoding="utf-8") if args.salida else sys.stdout
+    total = 0
+
+    db = SessionLocal()
+    try:
+        for ids in lotes_usuarios(db, args.lote):
+            for usuario_id, dashboard in dashboards_financieros(db, ids).items():
+                salida.write(json.dumps({
+                    "usuario_id": usuario_id,
+                    "patrimonio_neto": dashboard["resumen"]["patrimonio_neto"],
+                    "ratio_endeudamiento_porcentaje":
+                        dashboard["indicadores"]["ratio_endeudamiento_porcentaje"]
+                }, default=str) + "\n")
+                total += 1
+    finally:
+        db.close()
+
+        if salida is not sys.stdout:
+            salida.close()
+
+    print(f"Usuarios procesados: {total}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Alertas de presupuesto de toda la base de usuarios (job nocturno).
+
+Los usuarios se parten en tramos [desde_usuario, hasta_usuario) por id.
+Cada tramo se evalúa con una consulta agrupada y sus alertas se
+reemplazan y se marca completo en la misma transacción.
+
+Los tramos se guardan por corrida (por defecto la fecha del día): cada
+noche arranca una corrida nueva que reevalúa todo, y relanzar la misma
+corrida tras un fallo retoma solo los tramos pendientes o con error.
+"""
+from datetime import datetime
+
+from sqlalchemy import func, delete, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services.presupuesto_service import presupuestos_con_gasto, estado_presupuesto
+
+Alerta = models.AlertaPresupuestoMensual
+Tramo = models.TramoAlertas
+
+
+def planificar_tramos(
+    db: Session,
+    corrida: str,
+    anio: int,
+    mes: int,
+    tamano: int,
+    reiniciar: bool = False
+):
+    """
+    Crea los tramos que falten en la corrida para el mes y devuelve los
+    ids de los que hay que procesar (pendientes o con error; todos si
+    reiniciar).
+    """
+
+    de_la_corrida = [Tramo.corrida == corrida, Tramo.anio == anio, Tramo.mes == mes]
+
+    minimo, maximo = db.query(
+        func.min(models.Presupuesto.usuario_id),
+        func.max(models.Presupuesto.usuario_id)
+    ).filter(
+        models.Presupuesto.anio == anio,
+        models.Presupuesto.mes == mes
+    ).one()
+
+    if minimo is not None:
+        existentes = {
+            desde for (desde,) in db.query(Tramo.desde_usuario)
+            .filter(*de_la_corrida)
+        }
+
+        # Tramos alineados a múltiplos de `tamano`, así una corrida
+        # posterior con usuarios nuevos no solapa los ya creados
+        nuevos = [
+            {
+                "corrida": corrida,
+                "anio": anio,
+                "mes": mes,
+                "desde_usuario": desde,
+                "hasta_usuario": desde + tamano
+            }
+            for desde in range(minimo - minimo % tamano, maximo + 1, tamano)
+            if desde not in existentes
+        ]
+
+        if nuevos:
+            try:
+                with db.begin_nested():
+                    db.execute(insert(Tramo), nuevos)
+            except IntegrityError:
+                # Otra corrida creó los mismos tramos
+                pass
+
+    if reiniciar:
+        db.query(Tramo)\
+            .filter(*de_la_corrida)\
+            .update({"estado": "pendiente", "error": None}, synchronize_session=False)
+
+    db.commit()
+
+    return [
+        tramo_id for (tramo_id,) in db.query(Tramo.id)
+        .filter(*de_la_corrida, Tramo.estado != "completo")
+        .order_by(Tramo.desde_usuario)
+    ]
+
+
+def procesar_tramo(db: Session, tramo_id: int):
+    """
+    Evalúa los presupuestos del tramo y reemplaza sus alertas. Devuelve
+    (presupuestos evaluados, alertas). Si falla, el tramo queda en error.
+    """
+
+    tramo = db.get(Tramo, tramo_id)
+    anio, mes = tramo.anio, tramo.mes
+
+    try:
+        filas = presupuestos_con_gasto(
+            db, mes, anio,
+            models.Presupuesto.usuario_id >= tramo.desde_usuario,
+            models.Presupuesto.usuario_id < tramo.hasta_usuario
+        )
+
+        ahora = datetime.utcnow()
+        alertas = []
+
+        for presupuesto, gastado in filas:
+            porcentaje, estado = estado_presupuesto(presupuesto.monto_limite, gastado)
+
+            if estado == "OK":
+                continue
+
+            alertas.append({
+                "usuario_id": presupuesto.usuario_id,
+                "presupuesto_id": presupuesto.id,
+                "anio": anio,
+                "mes": mes,
+                "categoria": presupuesto.categoria,
+                "limite": presupuesto.monto_limite,
+                "gastado": gastado,
+                "porcentaje": round(porcentaje, 2),
+                "estado": estado,
+                "generado_en": ahora
+            })
+
+        db.execute(
+            delete(Alerta).where(
+                Alerta.anio == anio,
+                Alerta.mes == mes,
+                Alerta.usuario_id >= tramo.desde_usuario,
+                Alerta.usuario_id < tramo.hasta_usuario
+            )
+        )
+
+        if alertas:
+            db.execute(insert(Alerta), alertas)
+
+        tramo.estado = "completo"
+        tramo.presupuestos = len(filas)
+        tramo.alertas = len(alertas)
+        tramo.error = None
+        tramo.actualizado_en = ahora
+
+        db.commit()
+
+    except Exception as e:
+        db.rollback()
+        db.query(Tramo).filter(Tramo.id == tramo_id).update(
+            {"estado": "error", "error": repr(e), "actualizado_en": datetime.utcnow()},
+            synchronize_session=False
+        )
+        db.commit()
+        raise
+
+    return len(filas), len(alertas)
@@ -0,0 +1,95 @@
+"""
+Cache de respuestas de reportes por versión de datos del usuario.
+
+La clave es (ruta, parámetros, usuario, versión): cualquier escritura
+sube la versión (version_service.incrementar_version) y las entradas
+viejas dejan de usarse solas, sin invalidación explícita. El backend se
+elige con RESPUESTAS_CACHE_BACKEND; se pueden registrar otros (por
+ejemplo uno compartido entre procesos) con registrar_backend.
+"""
+from functools import wraps
+
+from app.config import (
+    RESPUESTAS_CACHE_BACKEND, RESPUESTAS_CACHE_MAX_ITEMS, RESPUESTAS_CACHE_TTL_SEGUNDOS
+)
+from app.services.cache_service import CacheTTL
+from app.services.version_service import version_datos
+
+
+class CacheNula:
+    """Backend que no guarda nada (cache desactivada)."""
+
+    def __init__(self):
+        self.fallos = 0
+
+    def get(self, clave):
+        self.fallos += 1
+        return None
+
+    def set(self, clave, valor):
+        pass
+
+    def limpiar(self):
+        pass
+
+    def estadisticas(self):
+        return {"items": 0, "aciertos": 0, "fallos": self.fallos, "tasa_aciertos": 0}
+
+
+# Backends: nombre -> fábrica. Deben ofrecer get, set, limpiar y estadisticas.
+BACKENDS = {
+    "memoria": lambda: CacheTTL(
+        max_items=RESPUESTAS_CACHE_MAX_ITEMS,
+        ttl_segundos=RESPUESTAS_CACHE_TTL_SEGUNDOS
+    ),
+    "nula": CacheNula,
+}
+
+
+def registrar_backend(nombre: str, fabrica):
+    BACKENDS[nombre] = fabrica
+
+
+def crear_backend(nombre: str):
+
+    if nombre not in BACKENDS:
+        raise ValueError(f"Backend de cache desconocido: {nombre}")
+
+    return BACKENDS[nombre]()
+
+
+cache_respuestas = crear_backend(RESPUESTAS_CACHE_BACKEND)
+
+
+def cache_por_version(ruta: str, usuario: str = "current_user"):
+    """
+    Decorador para endpoints de reporte. `usuario` es el parámetro con el
+    usuario actual (o directamente su id). db y el usuario no forman
+    parte de los parámetros de la clave.
+    """
+
+    def decorador(endpoint):
+
+        @wraps(endpoint)
+        def envoltorio(**kwargs):
+            db = kwargs["db"]
+            usuario_id = getattr(kwargs[usuario], "id", kwargs[usuario])
+
+            parametros = tuple(sorted(
+                (nombre, valor) for nombre, valor in kwargs.items()
+                if nombre not in ("db", usuario)
+            ))
+
+            clave = (ruta, parametros, usuario_id, version_datos(db, usuario_id))
+
+            respuesta = cache_respuestas.get(clave)
+
+            if respuesta is None:
+                respuesta = endpoint(**kwargs)
+                cache_respuestas.set(clave, respuesta)
+
+            return respuesta
+
+        return envoltorio
+
+    return decorador
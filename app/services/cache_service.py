@@ -0,0 +1,83 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+class CacheTTL:
+    """
+    Cache en memoria acotada (LRU) con expiración por TTL.
+
+    Es segura entre hilos y lleva contadores de aciertos/fallos para
+    poder dimensionarla.
+    """
+
+    def __init__(self, max_items: int = 1000, ttl_segundos: float = 60):
+        self.max_items = max_items
+        self.ttl_segundos = ttl_segundos
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+
+    def get(self, clave):
+
+        with self._lock:
+            entrada = self._datos.get(clave)
+
+            if entrada is None:
+                self.fallos += 1
+                return None
+
+            valor, expira = entrada
+
+            if expira < time.monotonic():
+                del self._datos[clave]
+                self.fallos += 1
+                return None
+
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return valor
+
+    def set(self, clave, valor):
+
+        with self._lock:
+            self._datos[clave] = (valor, time.monotonic() + self.ttl_segundos)
+            self._datos.move_to_end(clave)
+
+            while len(self._datos) > self.max_items:
+                self._datos.popitem(last=False)
+                self.expulsiones += 1
+
+    def eliminar(self, clave):
+
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def eliminar_si(self, condicion):
+        """Elimina todas las claves para las que condicion(clave) es verdadera."""
+
+        with self._lock:
+            for clave in [c for c in self._datos if condicion(c)]:
+                del self._datos[clave]
+
+    def limpiar(self):
+
+        with self._lock:
+            self._datos.clear()
+
+    def estadisticas(self):
+
+        with self._lock:
+            total = self.aciertos + self.fallos
+
+            return {
+                "items": len(self._datos),
+                "max_items": self.max_items,
+                "ttl_segundos": self.ttl_segundos,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "expulsiones": self.expulsiones,
+                "tasa_aciertos": round(self.aciertos / total, 4) if total else 0
+            }
@@ -0,0 +1,118 @@
+import re
+import unicodedata
+
+# 🔹 Palabras clave (sin tildes, en minúscula). El orden define la
+# prioridad cuando un texto coincide con varias categorías.
+CATEGORIAS = {
+    "Alimentación": [
+        "comida", "restaurante", "almuerzo", "verduras", "frutas",
+        "mercado", "olimpica", "exito", "ara"
+    ],
+    "Transporte": ["uber", "bus", "taxi", "gasolina", "transporte"],
+    "Ocio": ["cine", "juegos", "netflix"],
+    "Salud": ["medico", "farmacia"],
+    "Hogar": ["arriendo"],
+    "Recibos": ["luz", "agua", "gas", "internet", "plan movil"],
+}
+
+INGRESO_KEYWORDS = [
+    "salario", "ingreso", "me pagaron", "deposito", "gane", "recibi"
+]
+
+# Categoría por defecto de los ingresos sin categoría propia
+CATEGORIA_INGRESO = "Ingreso"
+
+# Palabras que se quitan de la descripción
+BASURA = ["por", "de", "del", "la", "el", "los", "las"]
+
+
+def _alternativas(palabras):
+    # Más largas primero para que "plan movil" gane sobre prefijos
+    return "|".join(re.escape(p) for p in sorted(palabras, key=len, reverse=True))
+
+
+def _compilar():
+
+    partes = [r"(?P<monto>\$?\s?\d[\d.,]*)"]
+
+    for i, palabras in enumerate(CATEGORIAS.values()):
+        partes.append(rf"(?P<c{i}>\b(?:{_alternativas(palabras)})\b)")
+
+    partes.append(rf"(?P<ingreso>\b(?:{_alternativas(INGRESO_KEYWORDS)})\b)")
+    partes.append(rf"(?P<basura>\b(?:{_alternativas(BASURA)})\b)")
+
+    return re.compile("|".join(partes))
+
+
+# Se compila una sola vez al importar
+_PATRON = _compilar()
+_NOMBRES_CATEGORIAS = list(CATEGORIAS)
+
+
+def _normalizar(texto: str):
+    """Minúsculas y sin tildes, conservando la longitud del texto."""
+
+    return "".join(
+        unicodedata.normalize("NFKD", c)[0].lower() for c in texto
+    )
+
+
+def clasificar(texto: str):
+    """
+    Extrae tipo, monto, categoría y descripción en una sola pasada
+    del patrón combinado. monto es None si el texto no trae cifras.
+    """
+
+    normalizado = _normalizar(texto or "")
+
+    monto = None
+    prioridad = None
+    es_ingreso = False
+    quitar = []
+
+    for match in _PATRON.finditer(normalizado):
+        grupo = match.lastgroup
+
+        if grupo == "monto":
+            if monto is None:
+                cifra = re.sub(r"[^\d]", "", match.group())
+                monto = float(cifra)
+            quitar.append(match.span())
+
+        elif grupo == "basura":
+            quitar.append(match.span())
+
+        elif grupo == "ingreso":
+            es_ingreso = True
+
+        else:
+            indice = int(grupo[1:])
+            if prioridad is None or indice < prioridad:
+                prioridad = indice
+
+    tipo = "ingreso" if es_ingreso else "gasto"
+
+    if prioridad is not None:
+        categoria = _NOMBRES_CATEGORIAS[prioridad]
+    elif es_ingreso:
+        categoria = CATEGORIA_INGRESO
+    else:
+        categoria = "General"
+
+    # 🔹 Descripción: texto original sin montos ni palabras basura
+    partes = []
+    anterior = 0
+    for inicio, fin in quitar:
+        partes.append(texto[anterior:inicio])
+        anterior = fin
+    partes.append(texto[anterior:])
+
+    descripcion = re.sub(r"\s+", " ", "".join(partes)).strip()
+    descripcion = descripcion[:1].upper() + descripcion[1:]
+
+    return {
+        "tipo": tipo,
+        "monto": monto,
+        "categoria": categoria,
+        "descripcion": descripcion
+    }
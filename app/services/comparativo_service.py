@@ -0,0 +1,145 @@
+"""
+Comparativo de gastos por categoría entre varios meses seguidos.
+
+Una sola consulta agrupada por (anio, mes, categoria) sobre el resumen
+mensual (fuente_resumen) trae todos los periodos; diferencias,
+variaciones y alertas se calculan sobre ese resultado, sin una consulta
+extra por mes.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session
+
+from app.services.periodos import mes_anterior
+from app.services.resumen_service import fuente_resumen
+
+
+def periodos_hasta(anio: int, mes: int, cantidad: int):
+    """Los `cantidad` meses que terminan en (anio, mes), del más antiguo al actual."""
+
+    periodos = [(anio, mes)]
+
+    for _ in range(cantidad - 1):
+        periodos.append(mes_anterior(*periodos[-1]))
+
+    return periodos[::-1]
+
+
+def gastos_por_periodo(db: Session, usuario_id: int, periodos: list):
+    """
+    {categoria: [total por periodo]} en el orden de `periodos`, con 0 en
+    los meses sin gasto.
+    """
+
+    Resumen = fuente_resumen(db, usuario_id, periodos[0], periodos[-1])
+
+    filas = db.query(
+        Resumen.anio,
+        Resumen.mes,
+        Resumen.categoria,
+        func.sum(Resumen.total)
+    )\
+    .filter(
+        Resumen.usuario_id == usuario_id,
+        Resumen.tipo == "gasto",
+        tuple_(Resumen.anio, Resumen.mes) >= periodos[0],
+        tuple_(Resumen.anio, Resumen.mes) <= periodos[-1]
+    )\
+    .group_by(Resumen.anio, Resumen.mes, Resumen.categoria)\
+    .all()
+
+    indice = {periodo: i for i, periodo in enumerate(periodos)}
+    totales = defaultdict(lambda: [Decimal(0)] * len(periodos))
+
+    for anio, mes, categoria, total in filas:
+        totales[categoria][indice[(int(anio), int(mes))]] = Decimal(total or 0)
+
+    return totales
+
+
+def variacion(actual, anterior):
+
+    if anterior > 0:
+        return round(float((actual - anterior) / anterior * 100), 2)
+
+    return None
+
+
+def comparar_categorias(db: Session, usuario_id: int, anio: int, mes: int, cantidad: int = 2):
+    """
+    Gasto por categoría en los últimos `cantidad` meses hasta (anio, mes).
+
+    mes_anterior/diferencia/variacion_porcentual comparan con el mes
+    previo; promedio_anterior es el promedio de los meses previos, que
+    es contra lo que se evalúan las alertas.
+    """
+
+    periodos = periodos_hasta(anio, mes, cantidad)
+    totales = gastos_por_periodo(db, usuario_id, periodos)
+
+    resultado = []
+
+    for categoria in sorted(totales):
+        serie = totales[categoria]
+        actual, anterior = serie[-1], serie[-2]
+        promedio = sum(serie[:-1]) / (len(serie) - 1)
+
+        detalle = []
+        previo = None
+
+        for (a, m), total in zip(periodos, serie):
+            detalle.append({
+                "anio": a,
+                "mes": m,
+                "total": total,
+                "diferencia": total - previo if previo is not None else None,
+                "variacion_porcentual": variacion(total, previo) if previo is not None else None
+            })
+            previo = total
+
+        resultado.append({
+            "categoria": categoria,
+            "mes_actual": actual,
+            "mes_anterior": anterior,
+            "diferencia": actual - anterior,
+            "variacion_porcentual": variacion(actual, anterior),
+            "promedio_anterior": promedio,
+            "periodos": detalle
+        })
+
+    return resultado
+
+
+def alertas_comparativo(comparativo: list, umbral: float):
+    """
+    nuevo_gasto: gasto este mes y ninguno en los meses previos.
+    aumento_significativo: el mes supera al promedio previo en más de
+    `umbral` %.
+    """
+
+    alertas = []
+
+    for fila in comparativo:
+        actual = fila["mes_actual"]
+        promedio = fila["promedio_anterior"]
+
+        if actual > 0 and promedio == 0:
+            alertas.append({
+                "categoria": fila["categoria"],
+                "tipo_alerta": "nuevo_gasto",
+                "variacion_porcentual": None
+            })
+            continue
+
+        cambio = variacion(actual, promedio)
+
+        if cambio is not None and cambio > umbral:
+            alertas.append({
+                "categoria": fila["categoria"],
+                "tipo_alerta": "aumento_significativo",
+                "variacion_porcentual": cambio
+            })
+
+    return alertas
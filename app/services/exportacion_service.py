@@ -0,0 +1,134 @@
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select
+
+from app import models
+from app.database import SessionLocal
+from app.services.movimientos_service import consulta_agrupada, agrupar_fila
+
+TAMANO_LOTE = 1000
+
+COLUMNAS = [
+    "id", "fecha", "tipo", "monto", "categoria", "descripcion",
+    "cuenta_id", "cuenta", "transaccion_id"
+]
+
+COLUMNAS_AGRUPADAS = [
+    "id", "transaccion_id", "fecha", "tipo", "monto", "categoria",
+    "descripcion", "cuenta_origen", "cuenta_destino"
+]
+
+
+def _consulta_plana(usuario_id: int):
+
+    return select(
+        models.Movimiento.id,
+        models.Movimiento.fecha,
+        models.Movimiento.tipo,
+        models.Movimiento.monto,
+        models.Movimiento.categoria,
+        models.Movimiento.descripcion,
+        models.Movimiento.cuenta_id,
+        models.Cuenta.nombre.label("cuenta"),
+        models.Movimiento.transaccion_id
+    )\
+    .join(models.Cuenta, models.Cuenta.id == models.Movimiento.cuenta_id)\
+    .where(models.Movimiento.usuario_id == usuario_id)
+
+
+def _filtros(desde: date | None, hasta: date | None, cuenta_id: int | None):
+
+    filtros = []
+
+    if desde:
+        filtros.append(models.Movimiento.fecha >= datetime.combine(desde, datetime.min.time()))
+
+    if hasta:
+        # hasta es inclusivo
+        filtros.append(models.Movimiento.fecha < datetime.combine(hasta + timedelta(days=1), datetime.min.time()))
+
+    if cuenta_id:
+        filtros.append(models.Movimiento.cuenta_id == cuenta_id)
+
+    return filtros
+
+
+def _serializable(valor):
+
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+
+    if valor is not None and not isinstance(valor, (str, int, float, bool)):
+        return float(valor)
+
+    return valor
+
+
+def exportar_movimientos(
+    usuario_id: int,
+    formato: str = "csv",
+    desde: date | None = None,
+    hasta: date | None = None,
+    cuenta_id: int | None = None,
+    agrupar: bool = False
+):
+    """
+    Generador de la exportación (texto por lotes).
+
+    Abre su propia sesión porque corre mientras se envía la respuesta, y
+    lee con yield_per para usar un cursor del lado del servidor: la
+    memoria queda acotada a un lote sin importar cuántos años haya.
+    """
+
+    db = SessionLocal()
+
+    try:
+        filtros = _filtros(desde, hasta, cuenta_id)
+
+        if agrupar:
+            columnas = COLUMNAS_AGRUPADAS
+            stmt = consulta_agrupada(db, usuario_id).filter(*filtros)\
+                .order_by(models.Movimiento.fecha, models.Movimiento.id)\
+                .statement
+        else:
+            columnas = COLUMNAS
+            stmt = _consulta_plana(usuario_id).where(*filtros)\
+                .order_by(models.Movimiento.fecha, models.Movimiento.id)
+
+        resultado = db.execute(stmt.execution_options(yield_per=TAMANO_LOTE))
+
+        if formato == "csv":
+            buffer = io.StringIO()
+            escritor = csv.writer(buffer)
+            escritor.writerow(columnas)
+            yield buffer.getvalue()
+
+        for lote in resultado.partitions():
+
+            if agrupar:
+                registros = [agrupar_fila(f, usuario_id) for f in lote]
+            else:
+                registros = [f._mapping for f in lote]
+
+            if formato == "csv":
+                buffer = io.StringIO()
+                escritor = csv.writer(buffer)
+                escritor.writerows(
+                    [_serializable(r.get(c)) for c in columnas] for r in registros
+                )
+            else:
+                buffer = io.StringIO()
+                for r in registros:
+                    buffer.write(json.dumps(
+                        {c: _serializable(r.get(c)) for c in columnas},
+                        ensure_ascii=False
+                    ))
+                    buffer.write("\n")
+
+            yield buffer.getvalue()
+
+    finally:
+        db.close()
@@ -1,37 +1,38 @@
+from decimal import Decimal
+
+from sqlalchemy import func, case
 from sqlalchemy.orm import Session
 from app.models import Cuenta
-import re
+from app.services.clasificador import clasificar
+
+CENTAVOS = Decimal("0.01")
+
+TIPOS_LIQUIDEZ = ("debito", "ahorro")
 
-def dashboard_financiero(usuario_id: int, db: Session):
 
-    cuentas = db.query(Cuenta).filter(
-        Cuenta.usuario_id == usuario_id
-    ).all()
+def _saldo():
+    return func.coalesce(Cuenta.saldo, 0)
 
-    liquidez = 0
-    inversiones = 0
-    deuda = 0
 
-    for cuenta in cuentas:
+def _cupo_usado():
+    return func.coalesce(Cuenta.cupo_total, 0) - func.coalesce(Cuenta.cupo_disponible, 0)
 
-        if cuenta.tipo_cuenta in ["debito", "ahorro"]:
-            liquidez += float(cuenta.saldo or 0)
 
-        elif cuenta.tipo_cuenta == "inversion":
-            inversiones += float(cuenta.saldo or 0)
+def indicadores_financieros(liquidez, inversiones, deuda):
+    """Resumen e indicadores a partir de los totales, en Decimal exacto."""
 
-        elif cuenta.tipo_cuenta == "credito":
-            usado = float((cuenta.cupo_total or 0) - (cuenta.cupo_disponible or 0))
-            deuda += usado
+    liquidez = Decimal(liquidez or 0)
+    inversiones = Decimal(inversiones or 0)
+    deuda = Decimal(deuda or 0)
 
     patrimonio_neto = liquidez + inversiones - deuda
 
     # Ratio de endeudamiento
     activos = liquidez + inversiones
     if activos > 0:
-        ratio_endeudamiento = round((deuda / activos) * 100, 2)
+        ratio_endeudamiento = (deuda / activos * 100).quantize(CENTAVOS)
     else:
-        ratio_endeudamiento = 0
+        ratio_endeudamiento = Decimal("0.00")
 
     # Nivel de salud financiera
     if ratio_endeudamiento < 30:
@@ -43,10 +44,10 @@ def dashboard_financiero(usuario_id: int, db: Session):
 
     return {
         "resumen": {
-            "liquidez": round(liquidez, 2),
-            "inversiones": round(inversiones, 2),
-            "deuda": round(deuda, 2),
-            "patrimonio_neto": round(patrimonio_neto, 2),
+            "liquidez": liquidez.quantize(CENTAVOS),
+            "inversiones": inversiones.quantize(CENTAVOS),
+            "deuda": deuda.quantize(CENTAVOS),
+            "patrimonio_neto": patrimonio_neto.quantize(CENTAVOS),
         },
         "indicadores": {
             "ratio_endeudamiento_porcentaje": ratio_endeudamiento,
@@ -55,42 +56,63 @@ def dashboard_financiero(usuario_id: int, db: Session):
     }
 
 
-def parsear_movimiento(texto: str):
-
-    texto_lower = texto.lower()
-
-    # 🔹 detectar tipo
-    ingreso_keywords = ["salario", "ingreso", "me pagaron", "deposito", "gané"]
-
-    tipo = "ingreso" if any(k in texto_lower for k in ingreso_keywords) else "gasto"
-
-    # 🔹 detectar monto
-    match = re.search(r'(\d[\d\.,]*)', texto_lower)
-    monto = float(match.group(1).replace(".", "").replace(",", "")) if match else 0
+def dashboard_financiero(usuario_id: int, db: Session):
+    """
+    Totales del usuario en una consulta agrupada por tipo de cuenta: el
+    saldo, o el cupo usado si la cuenta es crédito.
+    """
+
+    totales = dict(
+        db.query(
+            Cuenta.tipo_cuenta,
+            func.sum(case(
+                (Cuenta.tipo_cuenta == "credito", _cupo_usado()),
+                else_=_saldo()
+            ))
+        )
+        .filter(Cuenta.usuario_id == usuario_id)
+        .group_by(Cuenta.tipo_cuenta)
+        .all()
+    )
+
+    return indicadores_financieros(
+        liquidez=sum(Decimal(totales.get(t) or 0) for t in TIPOS_LIQUIDEZ),
+        inversiones=totales.get("inversion"),
+        deuda=totales.get("credito")
+    )
+
+
+def dashboards_financieros(db: Session, usuario_ids: list):
+    """
+    Variante por lotes para reportes: {usuario_id: dashboard} de varios
+    usuarios en una sola consulta agrupada por usuario_id. Los usuarios
+    sin cuentas quedan en cero.
+    """
+
+    filas = db.query(
+        Cuenta.usuario_id,
+        func.sum(case((Cuenta.tipo_cuenta.in_(TIPOS_LIQUIDEZ), _saldo()), else_=0)),
+        func.sum(case((Cuenta.tipo_cuenta == "inversion", _saldo()), else_=0)),
+        func.sum(case((Cuenta.tipo_cuenta == "credito", _cupo_usado()), else_=0))
+    )\
+    .filter(Cuenta.usuario_id.in_(usuario_ids))\
+    .group_by(Cuenta.usuario_id)\
+    .all()
+
+    totales = {usuario_id: resto for usuario_id, *resto in filas}
 
-    # 🔹 detectar categoria
-    categorias = {
-        "Alimentación": ["verduras", "comida", "frutas", "mercado", "olimpica", "exito", "Ara"],
-        "Transporte": ["uber", "bus", "taxi", "gasolina"],
-        "Ocio": ["cine", "juegos", "netflix"],
-        "Salud": ["medico", "farmacia"],
-        "Recibos": ["luz", "agua", "gas", "internet", "plan movil"],
+    return {
+        usuario_id: indicadores_financieros(*totales.get(usuario_id, (0, 0, 0)))
+        for usuario_id in usuario_ids
     }
 
-    categoria_detectada = "General"
 
-    for cat, palabras in categorias.items():
-        if any(p in texto_lower for p in palabras):
-            categoria_detectada = cat
-            break
+def parsear_movimiento(texto: str):
 
-    # 🔹 limpiar descripcion
-    descripcion = re.sub(r'\$?\s?\d[\d\.,]*', '', texto)
-    descripcion = descripcion.replace("por", "").strip()
+    resultado = clasificar(texto)
 
-    return {
-        "tipo": tipo,
-        "monto": monto,
-        "categoria": categoria_detectada,
-        "descripcion": descripcion
-    }
\ No newline at end of file
+    # 🔹 Sin cifras el monto se reporta como 0
+    if resultado["monto"] is None:
+        resultado["monto"] = 0
+
+    return resultado
@@ -0,0 +1,141 @@
+"""
+Hash y verificación de contraseñas fuera del threadpool de requests.
+
+pbkdf2_sha256 consume decenas de ms de CPU por operación; se ejecuta en
+un ProcessPoolExecutor propio para que una ráfaga de logins no frene al
+resto de endpoints. Las operaciones en cola + en curso están acotadas:
+al superar HASH_MAX_PENDIENTES se rechaza con HashSaturado (503).
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+
+from app.config import HASH_ROUNDS, HASH_WORKERS, HASH_MAX_PENDIENTES
+from app import metricas
+
+
+class HashSaturado(Exception):
+    pass
+
+
+@lru_cache(maxsize=None)
+def contexto_hash(rounds: int):
+    """
+    CryptContext con los rounds dados. min_rounds = rounds hace que los
+    hashes antiguos, con menos rounds, se marquen para actualizar.
+    """
+
+    return CryptContext(
+        schemes=["pbkdf2_sha256"],
+        deprecated="auto",
+        pbkdf2_sha256__default_rounds=rounds,
+        pbkdf2_sha256__min_rounds=rounds
+    )
+
+
+# 🔹 Trabajo que corre en los procesos del pool (funciones de módulo
+# para que se puedan serializar)
+
+def _hashear(password: str, rounds: int):
+    return contexto_hash(rounds).hash(password)
+
+
+def _verificar(password: str, password_hash: str, rounds: int):
+    """(válida, nuevo_hash); nuevo_hash es None si no hace falta rehash."""
+
+    return contexto_hash(rounds).verify_and_update(password, password_hash)
+
+
+# 🔹 Pool y límite de concurrencia
+
+_pool = None
+_pendientes = 0
+_lock = threading.Lock()
+
+
+def _obtener_pool():
+    global _pool
+
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=HASH_WORKERS)
+
+    return _pool
+
+
+def _reservar(operacion: str):
+    global _pendientes
+
+    with _lock:
+        if _pendientes >= HASH_MAX_PENDIENTES:
+            metricas.hash_rechazados.incrementar((operacion,))
+            raise HashSaturado("Demasiadas operaciones de contraseña en curso")
+
+        _pendientes += 1
+
+    metricas.hash_pendientes.ajustar(1)
+
+
+def _liberar():
+    global _pendientes
+
+    with _lock:
+        _pendientes -= 1
+
+    metricas.hash_pendientes.ajustar(-1)
+
+
+async def _ejecutar(operacion: str, funcion, *args):
+
+    _reservar(operacion)
+    inicio = time.perf_counter()
+
+    try:
+        if HASH_WORKERS > 0:
+            return await asyncio.wrap_future(_obtener_pool().submit(funcion, *args))
+
+        return await run_in_threadpool(funcion, *args)
+
+    finally:
+        _liberar()
+        metricas.latencia_hash.observar((operacion,), time.perf_counter() - inicio)
+
+
+async def hash_password_async(password: str):
+    return await _ejecutar("hash", _hashear, password, HASH_ROUNDS)
+
+
+async def verificar_password_async(password: str, password_hash: str):
+    """
+    Verifica y, si el hash quedó con parámetros viejos (menos rounds),
+    devuelve también el hash nuevo para guardarlo: (válida, nuevo_hash).
+    """
+
+    return await _ejecutar(
+        "verificar", _verificar, password, password_hash, HASH_ROUNDS
+    )
+
+
+def estadisticas():
+
+    return {
+        "workers": HASH_WORKERS,
+        "rounds": HASH_ROUNDS,
+        "max_pendientes": HASH_MAX_PENDIENTES,
+        "pendientes": _pendientes,
+    }
+
+
+def cerrar_pool():
+
+    global _pool
+
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
@@ -0,0 +1,182 @@
+"""
+Idempotency-Key para endpoints de escritura.
+
+La primera petición con una clave la reserva (fila sin respuesta) y, si
+termina bien, guarda su respuesta. Los reintentos con la misma clave
+reciben esa respuesta guardada sin volver a tocar cuentas ni
+movimientos. Si la escritura falla la reserva se libera para poder
+reintentar. Las claves vencen a las IDEMPOTENCIA_TTL_HORAS.
+"""
+import hashlib
+import inspect
+import json
+import random
+from datetime import datetime, timedelta
+
+from fastapi import Header, HTTPException
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import IDEMPOTENCIA_TTL_HORAS
+from app.respuestas import RespuestaJSON
+
+Clave = models.ClaveIdempotencia
+
+# Probabilidad de purgar claves vencidas en cada reserva
+PROBABILIDAD_PURGA = 0.01
+
+
+def huella(ruta: str, cuerpo):
+    return hashlib.sha256(f"{ruta}|{cuerpo}".encode()).hexdigest()
+
+
+def purgar_vencidas(db: Session):
+
+    resultado = db.execute(delete(Clave).where(Clave.expira_en < datetime.utcnow()))
+    db.commit()
+
+    return resultado.rowcount
+
+
+def reservar(db: Session, usuario_id: int, clave: str, firma: str):
+    """
+    Devuelve None si la clave quedó reservada para esta petición, o la
+    fila existente (con o sin respuesta) si ya se usó.
+    """
+
+    ahora = datetime.utcnow()
+
+    if random.random() < PROBABILIDAD_PURGA:
+        purgar_vencidas(db)
+
+    existente = db.query(Clave).filter(
+        Clave.usuario_id == usuario_id,
+        Clave.clave == clave
+    ).first()
+
+    if existente is not None:
+        if existente.expira_en > ahora:
+            return existente
+
+        db.delete(existente)
+        db.flush()
+
+    try:
+        with db.begin_nested():
+            db.add(Clave(
+                usuario_id=usuario_id,
+                clave=clave,
+                huella=firma,
+                creado_en=ahora,
+                expira_en=ahora + timedelta(hours=IDEMPOTENCIA_TTL_HORAS)
+            ))
+        db.commit()
+
+    except IntegrityError:
+        # Otra petición con la misma clave llegó primero
+        db.rollback()
+        return db.query(Clave).filter(
+            Clave.usuario_id == usuario_id,
+            Clave.clave == clave
+        ).first()
+
+    return None
+
+
+def guardar_respuesta(db: Session, usuario_id: int, clave: str, estado: int, respuesta):
+
+    db.query(Clave).filter(
+        Clave.usuario_id == usuario_id,
+        Clave.clave == clave
+    ).update(
+        {"estado_http": estado, "respuesta": json.dumps(jsonable_encoder(respuesta))},
+        synchronize_session=False
+    )
+    db.commit()
+
+
+def liberar(db: Session, usuario_id: int, clave: str):
+
+    db.rollback()
+    db.execute(
+        delete(Clave).where(
+            Clave.usuario_id == usuario_id,
+            Clave.clave == clave,
+            Clave.estado_http.is_(None)
+        )
+    )
+    db.commit()
+
+
+def idempotente(endpoint):
+    """
+    Decorador para endpoints POST con db, current_user y un cuerpo
+    pydantic. Agrega el header opcional Idempotency-Key.
+    """
+
+    firma = inspect.signature(endpoint)
+    ruta = endpoint.__name__
+
+    parametros = list(firma.parameters.values()) + [
+        inspect.Parameter(
+            "idempotency_key",
+            inspect.Parameter.KEYWORD_ONLY,
+            default=Header(None, alias="Idempotency-Key", max_length=255),
+            annotation=str | None
+        )
+    ]
+
+    def envoltorio(**kwargs):
+        clave = kwargs.pop("idempotency_key")
+
+        if not clave:
+            return endpoint(**kwargs)
+
+        db = kwargs["db"]
+        usuario_id = kwargs["current_user"].id
+
+        cuerpo = "|".join(
+            v.model_dump_json() for v in kwargs.values() if isinstance(v, BaseModel)
+        )
+        firma_peticion = huella(ruta, cuerpo)
+
+        existente = reservar(db, usuario_id, clave, firma_peticion)
+
+        if existente is not None:
+            if existente.huella != firma_peticion:
+                raise HTTPException(
+                    status_code=422,
+                    detail="Idempotency-Key ya usada con otra petición"
+                )
+
+            if existente.estado_http is None:
+                raise HTTPException(
+                    status_code=409,
+                    detail="Petición con esta Idempotency-Key aún en curso"
+                )
+
+            return RespuestaJSON(
+                json.loads(existente.respuesta),
+                status_code=existente.estado_http,
+                headers={"Idempotent-Replayed": "true"}
+            )
+
+        try:
+            respuesta = endpoint(**kwargs)
+        except BaseException:
+            liberar(db, usuario_id, clave)
+            raise
+
+        guardar_respuesta(db, usuario_id, clave, 200, respuesta)
+
+        return respuesta
+
+    envoltorio.__name__ = endpoint.__name__
+    envoltorio.__doc__ = endpoint.__doc__
+    envoltorio.__signature__ = firma.replace(parameters=parametros)
+
+    return envoltorio
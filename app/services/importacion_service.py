@@ -0,0 +1,199 @@
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app import models, schemas
+from app.services.resumen_service import ajustar_resumen
+from app.services.presupuesto_service import evaluar_presupuestos
+from app.services.saldos_service import efecto, aplicar_delta
+from app.services.libro_service import registrar_asientos
+from app.services.version_service import incrementar_version
+
+
+def importar_movimientos(db: Session, usuario_id: int, registros: list):
+    """
+    Carga masiva de movimientos en una sola transacción.
+
+    - Valida todos los registros en una pasada (errores por fila).
+    - Trae y bloquea las cuentas implicadas en una sola consulta.
+    - Aplica saldo/cupo con el delta neto, un UPDATE por cuenta.
+    - Registra los asientos del libro en otro executemany.
+    - Inserta los movimientos con un único executemany.
+    - Evalúa presupuestos una sola vez al final.
+    """
+
+    errores = []
+    validos = []
+
+    # 🔹 1. Validar esquema
+    for indice, registro in enumerate(registros):
+
+        if not isinstance(registro, dict):
+            errores.append({"indice": indice, "detalle": "Registro inválido"})
+            continue
+
+        try:
+            movimiento = schemas.MovimientoImportar.model_validate(registro)
+        except ValidationError as e:
+            errores.append({"indice": indice, "detalle": e.errors(include_url=False, include_input=False)})
+            continue
+
+        if movimiento.tipo not in ("ingreso", "gasto"):
+            errores.append({"indice": indice, "detalle": "Tipo inválido"})
+            continue
+
+        if movimiento.monto <= 0:
+            errores.append({"indice": indice, "detalle": "El monto debe ser mayor a cero"})
+            continue
+
+        validos.append((indice, movimiento))
+
+    # 🔹 2. Cuentas del usuario en una sola consulta
+    ids_cuentas = {m.cuenta_id for _, m in validos}
+
+    # Bloqueadas en orden de id (FOR UPDATE) hasta el commit, así ningún
+    # otro movimiento cambia el disponible entre la validación y el UPDATE
+    cuentas = {
+        c.id: c
+        for c in db.query(models.Cuenta).filter(
+            models.Cuenta.id.in_(ids_cuentas),
+            models.Cuenta.usuario_id == usuario_id
+        )
+        .order_by(models.Cuenta.id)
+        .with_for_update()
+        .all()
+    } if ids_cuentas else {}
+
+    # Saldo/cupo en memoria mientras se recorren las filas
+    disponible = {
+        c.id: Decimal(c.cupo_disponible if c.tipo_cuenta == "credito" else c.saldo)
+        for c in cuentas.values()
+    }
+    iniciales = dict(disponible)
+    asientos = []
+
+    ahora = datetime.utcnow()
+    filas = []
+    resumen = defaultdict(lambda: [Decimal(0), 0])
+
+    # 🔹 3. Aplicar reglas financieras fila a fila (en memoria)
+    for indice, movimiento in validos:
+
+        cuenta = cuentas.get(movimiento.cuenta_id)
+
+        if not cuenta:
+            errores.append({"indice": indice, "detalle": "Cuenta no encontrada"})
+            continue
+
+        monto = Decimal(movimiento.monto)
+
+        if movimiento.tipo == "gasto":
+
+            if disponible[cuenta.id] < monto:
+                detalle = "Cupo insuficiente" if cuenta.tipo_cuenta == "credito" else "Saldo insuficiente"
+                errores.append({"indice": indice, "detalle": detalle})
+                continue
+
+            disponible[cuenta.id] -= monto
+
+        else:
+            disponible[cuenta.id] += monto
+
+            # Pago a tarjeta: no supera el cupo total
+            if cuenta.tipo_cuenta == "credito" and disponible[cuenta.id] > cuenta.cupo_total:
+                disponible[cuenta.id] = Decimal(cuenta.cupo_total)
+
+        fecha = movimiento.fecha or ahora
+        categoria = movimiento.categoria or "General"
+
+        filas.append({
+            "usuario_id": usuario_id,
+            "cuenta_id": cuenta.id,
+            "tipo": movimiento.tipo,
+            "monto": monto,
+            "descripcion": movimiento.descripcion or "Sin descripción",
+            "categoria": categoria,
+            "transaccion_id": movimiento.transaccion_id or None,
+            "fecha": fecha
+        })
+
+        asientos.append({
+            "cuenta_id": cuenta.id,
+            "concepto": "movimiento",
+            "delta": efecto(movimiento.tipo, monto),
+            "fecha": fecha
+        })
+
+        clave = (cuenta.id, fecha.year, fecha.month, movimiento.tipo, categoria)
+        resumen[clave][0] += monto
+        resumen[clave][1] += 1
+
+    errores.sort(key=lambda e: e["indice"])
+
+    if not filas:
+        return {"insertados": 0, "errores": errores, "alertas": []}
+
+    # 🔹 4. Escribir: un update neto por cuenta + un executemany
+    nominal = defaultdict(Decimal)
+    for a in asientos:
+        nominal[a["cuenta_id"]] += a["delta"]
+
+    for cuenta_id in sorted(disponible):
+        valor = disponible[cuenta_id]
+        neto = valor - iniciales[cuenta_id]
+
+        # Delta neto (con los recortes ya aplicados) en un UPDATE condicional
+        if neto and aplicar_delta(db, cuenta_id, neto) is None:
+            db.rollback()
+            return {
+                "insertados": 0,
+                "errores": [{"cuenta_id": cuenta_id, "detalle": "Saldo insuficiente"}],
+                "alertas": []
+            }
+
+        # Abonos recortados a cupo_total: ajuste para que el libro cuadre
+        recorte = valor - iniciales[cuenta_id] - nominal[cuenta_id]
+
+        if recorte:
+            asientos.append({
+                "cuenta_id": cuenta_id,
+                "concepto": "ajuste",
+                "delta": recorte,
+                "fecha": ahora
+            })
+
+    db.execute(insert(models.Movimiento), filas)
+    registrar_asientos(db, asientos)
+
+    for (cuenta_id, anio, mes, tipo, categoria), (total, cantidad) in resumen.items():
+        fecha = datetime(anio, mes, 1)
+
+        ajustar_resumen(
+            db,
+            usuario_id=usuario_id,
+            cuenta_id=cuenta_id,
+            fecha=fecha,
+            tipo=tipo,
+            categoria=categoria,
+            monto=total,
+            cantidad=cantidad
+        )
+
+    incrementar_version(db, usuario_id)
+    db.commit()
+
+    # 🔔 5. Presupuestos de los meses con gastos, una vez al final
+    meses = {(anio, mes) for (_, anio, mes, tipo, _) in resumen if tipo == "gasto"}
+
+    alertas = []
+
+    for anio, mes in sorted(meses):
+        for p in evaluar_presupuestos(db, usuario_id, mes, anio):
+            if p["alerta"]:
+                alertas.append({"anio": anio, "mes": mes, **p})
+
+    return {"insertados": len(filas), "errores": errores, "alertas": alertas}
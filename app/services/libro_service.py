@@ -0,0 +1,404 @@
+"""
+Libro de asientos por cuenta y cortes de saldo.
+
+Cada cambio de saldo (o de cupo disponible en crédito) se registra como
+un asiento de solo inserción con la fecha efectiva del movimiento: editar
+agrega un reverso y un asiento nuevo, borrar agrega un reverso.
+
+Los cortes guardan el saldo acumulado al inicio de cada mes. El saldo en
+una fecha es el corte más cercano anterior + los asientos desde ese
+corte, así la consulta nunca recorre más de un mes de historial. Los
+cortes se completan al escribir asientos (y en reconstruir_libro); un
+asiento con fecha pasada borra los cortes posteriores y se recalculan en
+la misma transacción. Las consultas de saldo no escriben.
+
+Las cuentas creadas antes del libro no tienen asiento de apertura: hasta
+correr reconstruir_libro (python -m app.scripts.reconstruir_libro
+--faltantes) su saldo en fecha se calcula desde movimientos, con el
+valor actual de la cuenta menos los movimientos posteriores.
+"""
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import func, extract, delete, insert, select, literal, case
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services.saldos_service import efecto
+
+Asiento = models.AsientoCuenta
+Corte = models.CorteSaldo
+
+# Efecto de un movimiento en SQL (ver saldos_service.efecto)
+_efecto_movimiento = case(
+    (models.Movimiento.tipo == "gasto", -models.Movimiento.monto),
+    else_=models.Movimiento.monto
+)
+
+
+def _invalidar_cortes(db: Session, cuenta_id: int, fecha):
+    db.execute(
+        delete(Corte).where(Corte.cuenta_id == cuenta_id, Corte.corte > fecha)
+    )
+
+
+def registrar_asiento(
+    db: Session,
+    cuenta_id: int,
+    fecha,
+    delta,
+    concepto: str = "movimiento",
+    movimiento_id: int | None = None
+):
+    """Agrega un asiento y completa los cortes; el commit lo hace quien llama."""
+
+    db.execute(
+        insert(Asiento).values(
+            cuenta_id=cuenta_id,
+            movimiento_id=movimiento_id,
+            concepto=concepto,
+            delta=delta,
+            fecha=fecha,
+            creado_en=datetime.utcnow()
+        )
+    )
+    _invalidar_cortes(db, cuenta_id, fecha)
+    asegurar_cortes(db, cuenta_id)
+
+
+def registrar_asientos(db: Session, asientos: list):
+    """
+    Varios asientos en un executemany (dicts con cuenta_id, fecha, delta,
+    concepto). Invalida y completa los cortes una vez por cuenta.
+    """
+
+    if not asientos:
+        return
+
+    ahora = datetime.utcnow()
+    db.execute(insert(Asiento), [{"creado_en": ahora, **a} for a in asientos])
+
+    primeras = {}
+    for a in asientos:
+        if a["cuenta_id"] not in primeras or a["fecha"] < primeras[a["cuenta_id"]]:
+            primeras[a["cuenta_id"]] = a["fecha"]
+
+    for cuenta_id, fecha in primeras.items():
+        _invalidar_cortes(db, cuenta_id, fecha)
+        asegurar_cortes(db, cuenta_id)
+
+
+def asentar_movimiento(db: Session, movimiento: models.Movimiento, signo: int = 1, cuenta=None):
+    """
+    Asiento del efecto de un movimiento (signo=-1 para el reverso).
+
+    cuenta es la fila que devolvió aplicar_delta: si una cuenta crédito
+    quedó en cupo_total puede que el abono se haya recortado, y se agrega
+    un asiento de ajuste para que el libro cuadre con la cuenta.
+    """
+
+    if movimiento.fecha is None:
+        db.flush()
+
+    registrar_asiento(
+        db,
+        movimiento.cuenta_id,
+        movimiento.fecha,
+        signo * efecto(movimiento.tipo, movimiento.monto),
+        concepto="movimiento" if signo > 0 else "reverso",
+        movimiento_id=movimiento.id
+    )
+
+    if (
+        cuenta is not None
+        and cuenta.tipo_cuenta == "credito"
+        and cuenta.cupo_disponible == cuenta.cupo_total
+    ):
+        conciliar(db, cuenta.id, cuenta.cupo_disponible, movimiento.fecha)
+
+
+def conciliar(db: Session, cuenta_id: int, valor_actual, fecha):
+    """Asiento de ajuste por la diferencia entre el libro y la cuenta."""
+
+    # Cuentas sin apertura aún no tienen libro (ver reconstruir_libro)
+    if not tiene_libro(db, cuenta_id):
+        return
+
+    diferencia = Decimal(valor_actual) - saldo_en_fecha(db, cuenta_id, None)
+
+    if diferencia:
+        registrar_asiento(db, cuenta_id, fecha, diferencia, concepto="ajuste")
+
+
+def tiene_libro(db: Session, cuenta_id: int):
+    """La cuenta tiene asiento de apertura (creada o reconstruida con libro)."""
+
+    return db.query(Asiento.id).filter(
+        Asiento.cuenta_id == cuenta_id,
+        Asiento.concepto == "apertura"
+    ).first() is not None
+
+
+def valor_cuenta(cuenta: models.Cuenta):
+    """Lo que sigue el libro: saldo, o cupo disponible si es crédito."""
+
+    if cuenta.tipo_cuenta == "credito":
+        return cuenta.cupo_disponible or Decimal(0)
+
+    return cuenta.saldo or Decimal(0)
+
+
+# 🔹 Cortes
+
+def _inicio_mes(fecha):
+    return datetime(fecha.year, fecha.month, 1)
+
+
+def _mes_siguiente(anio: int, mes: int):
+    return datetime(anio + mes // 12, mes % 12 + 1, 1)
+
+
+def asegurar_cortes(db: Session, cuenta_id: int):
+    """
+    Completa los cortes mensuales hasta el inicio del mes actual con una
+    consulta agrupada de los asientos posteriores al último corte. Se
+    llama en el camino de escritura, con la cuenta ya bloqueada por su
+    UPDATE de saldo.
+    """
+
+    objetivo = _inicio_mes(datetime.utcnow())
+
+    ultimo = db.query(Corte.corte, Corte.saldo)\
+        .filter(Corte.cuenta_id == cuenta_id)\
+        .order_by(Corte.corte.desc())\
+        .first()
+
+    if ultimo is not None and ultimo.corte >= objetivo:
+        return
+
+    anio = extract("year", Asiento.fecha)
+    mes = extract("month", Asiento.fecha)
+
+    filtros = [Asiento.cuenta_id == cuenta_id, Asiento.fecha < objetivo]
+
+    if ultimo is not None:
+        filtros.append(Asiento.fecha >= ultimo.corte)
+
+    meses = db.query(anio, mes, func.sum(Asiento.delta))\
+        .filter(*filtros)\
+        .group_by(anio, mes)\
+        .order_by(anio, mes)\
+        .all()
+
+    if ultimo is None and not meses:
+        return
+
+    acumulado = Decimal(ultimo.saldo) if ultimo is not None else Decimal(0)
+    filas = []
+
+    for a, m, total in meses:
+        acumulado += Decimal(total)
+        corte = _mes_siguiente(int(a), int(m))
+
+        if corte < objetivo:
+            filas.append({"cuenta_id": cuenta_id, "corte": corte, "saldo": acumulado})
+
+    filas.append({"cuenta_id": cuenta_id, "corte": objetivo, "saldo": acumulado})
+
+    # Otro request pudo crear los mismos cortes: se descarta este intento
+    try:
+        with db.begin_nested():
+            db.execute(insert(Corte), filas)
+    except IntegrityError:
+        pass
+
+
+def saldo_en_fecha(db: Session, cuenta_id: int, limite):
+    """
+    Saldo con los asientos anteriores a `limite` (None = todos): corte
+    más cercano + asientos desde el corte. Sin libro, desde movimientos.
+    """
+
+    if not tiene_libro(db, cuenta_id):
+        return _saldo_movimientos(db, cuenta_id, limite)
+
+    return _saldo_libro(db, cuenta_id, limite)
+
+
+def _saldo_libro(db: Session, cuenta_id: int, limite):
+
+    consulta = db.query(Corte.corte, Corte.saldo).filter(Corte.cuenta_id == cuenta_id)
+
+    if limite is not None:
+        consulta = consulta.filter(Corte.corte <= limite)
+
+    corte = consulta.order_by(Corte.corte.desc()).first()
+
+    filtros = [Asiento.cuenta_id == cuenta_id]
+
+    if corte is not None:
+        filtros.append(Asiento.fecha >= corte.corte)
+
+    if limite is not None:
+        filtros.append(Asiento.fecha < limite)
+
+    cola = db.query(func.coalesce(func.sum(Asiento.delta), 0))\
+        .filter(*filtros)\
+        .scalar()
+
+    base = Decimal(corte.saldo) if corte is not None else Decimal(0)
+
+    return base + Decimal(cola)
+
+
+def _saldo_movimientos(db: Session, cuenta_id: int, limite):
+    """Valor actual de la cuenta - efecto de los movimientos desde `limite`."""
+
+    actual = Decimal(valor_cuenta(db.get(models.Cuenta, cuenta_id)))
+
+    if limite is None:
+        return actual
+
+    posteriores = db.query(func.coalesce(func.sum(_efecto_movimiento), 0))\
+        .filter(
+            models.Movimiento.cuenta_id == cuenta_id,
+            models.Movimiento.fecha >= limite
+        )\
+        .scalar()
+
+    return actual - Decimal(posteriores)
+
+
+def serie_saldos(db: Session, cuenta_id: int, desde, hasta):
+    """
+    Saldo al cierre de cada día entre desde y hasta (fechas, inclusive):
+    un saldo inicial + una consulta agrupada por día del tramo (de
+    asientos, o de movimientos si la cuenta aún no tiene libro).
+    """
+
+    inicio = datetime(desde.year, desde.month, desde.day)
+    fin = datetime(hasta.year, hasta.month, hasta.day) + timedelta(days=1)
+
+    if tiene_libro(db, cuenta_id):
+        saldo = _saldo_libro(db, cuenta_id, inicio)
+        fuente, delta = Asiento, Asiento.delta
+    else:
+        saldo = _saldo_movimientos(db, cuenta_id, inicio)
+        fuente, delta = models.Movimiento, _efecto_movimiento
+
+    dia = func.date(fuente.fecha)
+
+    por_dia = {
+        str(d): Decimal(total)
+        for d, total in db.query(dia, func.sum(delta))
+        .filter(
+            fuente.cuenta_id == cuenta_id,
+            fuente.fecha >= inicio,
+            fuente.fecha < fin
+        )
+        .group_by(dia)
+        .all()
+    }
+
+    serie = []
+    actual = desde
+
+    while actual <= hasta:
+        saldo += por_dia.get(actual.isoformat(), Decimal(0))
+        serie.append({"fecha": actual, "saldo": saldo})
+        actual += timedelta(days=1)
+
+    return serie
+
+
+# 🔹 Reconstrucción
+
+def reconstruir_libro(
+    db: Session,
+    cuenta_id: int | None = None,
+    solo_faltantes: bool = False
+):
+    """
+    Rehace los asientos desde los movimientos: un asiento de apertura por
+    cuenta (valor actual - efecto de sus movimientos, fechado antes del
+    primero) y uno por movimiento. Sirve para crear el libro de cuentas
+    existentes o reparar desvíos; también recalcula los cortes.
+
+    Con solo_faltantes, solo las cuentas sin asiento de apertura.
+    """
+
+    Movimiento = models.Movimiento
+    Cuenta = models.Cuenta
+
+    cuentas = db.query(Cuenta)
+
+    if cuenta_id is not None:
+        cuentas = cuentas.filter(Cuenta.id == cuenta_id)
+
+    if solo_faltantes:
+        cuentas = cuentas.filter(
+            ~select(Asiento.id).where(
+                Asiento.cuenta_id == Cuenta.id,
+                Asiento.concepto == "apertura"
+            ).exists()
+        )
+
+    cuentas = cuentas.all()
+    ids = [c.id for c in cuentas]
+
+    if not ids:
+        return 0
+
+    db.execute(delete(Corte).where(Corte.cuenta_id.in_(ids)))
+    db.execute(delete(Asiento).where(Asiento.cuenta_id.in_(ids)))
+
+    efectos = {
+        c_id: (Decimal(ingresos or 0) - Decimal(gastos or 0), primera)
+        for c_id, ingresos, gastos, primera in db.query(
+            Movimiento.cuenta_id,
+            func.sum(Movimiento.monto).filter(Movimiento.tipo == "ingreso"),
+            func.sum(Movimiento.monto).filter(Movimiento.tipo == "gasto"),
+            func.min(Movimiento.fecha)
+        )
+        .filter(Movimiento.cuenta_id.in_(ids))
+        .group_by(Movimiento.cuenta_id)
+        .all()
+    }
+
+    ahora = datetime.utcnow()
+    aperturas = []
+
+    for cuenta in cuentas:
+        neto, primera = efectos.get(cuenta.id, (Decimal(0), None))
+        aperturas.append({
+            "cuenta_id": cuenta.id,
+            "concepto": "apertura",
+            "delta": Decimal(valor_cuenta(cuenta)) - neto,
+            "fecha": (primera or ahora) - timedelta(seconds=1),
+            "creado_en": ahora
+        })
+
+    db.execute(insert(Asiento), aperturas)
+
+    resultado = db.execute(
+        insert(Asiento).from_select(
+            ["cuenta_id", "movimiento_id", "concepto", "delta", "fecha", "creado_en"],
+            select(
+                Movimiento.cuenta_id,
+                Movimiento.id,
+                literal("movimiento"),
+                _efecto_movimiento,
+                Movimiento.fecha,
+                literal(ahora)
+            ).where(Movimiento.cuenta_id.in_(ids))
+        )
+    )
+
+    for c_id in ids:
+        asegurar_cortes(db, c_id)
+
+    db.commit()
+
+    return len(aperturas) + resultado.rowcount
+
@@ -0,0 +1,255 @@
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import and_, or_, exists, func, case, select, tuple_
+from datetime import datetime, date, timedelta
+from decimal import Decimal
+from app import models
+from app.services.paginacion import paginar
+from app.services.periodos import cubetas, expresion_cubeta, mes_anterior
+from app.services.resumen_service import fuente_resumen
+
+
+def consulta_agrupada(db: Session, usuario_id: int):
+    """
+    Movimientos del usuario con las transferencias ya emparejadas.
+
+    Una sola consulta: cada fila trae el movimiento, el nombre de su
+    cuenta y, si es una transferencia, la otra pata (self-join por
+    transaccion_id) con el nombre de su cuenta. De cada transferencia
+    solo queda la pata más reciente del usuario, así que el resultado
+    se puede paginar o exportar sin partir pares.
+    """
+
+    mov = models.Movimiento
+    contraparte = aliased(models.Movimiento)
+    otra_pata = aliased(models.Movimiento)
+    cuenta = aliased(models.Cuenta)
+    cuenta_contraparte = aliased(models.Cuenta)
+
+    # 🔎 ¿Hay otra pata del mismo usuario más reciente?
+    pata_mas_reciente = exists().where(
+        otra_pata.transaccion_id == mov.transaccion_id,
+        otra_pata.usuario_id == mov.usuario_id,
+        or_(
+            otra_pata.fecha > mov.fecha,
+            and_(otra_pata.fecha == mov.fecha, otra_pata.id > mov.id)
+        )
+    )
+
+    # 🔗 Una sola contraparte: la primera pata del tipo opuesto. El
+    # transaccion_id también llega de clientes, así que no se asume que
+    # cada id tenga exactamente dos patas
+    pata_opuesta = aliased(models.Movimiento)
+
+    id_contraparte = select(func.min(pata_opuesta.id))\
+        .where(
+            pata_opuesta.transaccion_id == mov.transaccion_id,
+            pata_opuesta.id != mov.id,
+            pata_opuesta.tipo != mov.tipo
+        )\
+        .correlate(mov)\
+        .scalar_subquery()
+
+    return db.query(
+        mov.id,
+        mov.usuario_id,
+        mov.tipo,
+        mov.monto,
+        mov.categoria,
+        mov.descripcion,
+        mov.transaccion_id,
+        mov.fecha,
+        cuenta.nombre.label("cuenta_nombre"),
+        contraparte.tipo.label("contraparte_tipo"),
+        contraparte.usuario_id.label("contraparte_usuario_id"),
+        cuenta_contraparte.nombre.label("contraparte_cuenta")
+    )\
+    .join(cuenta, cuenta.id == mov.cuenta_id)\
+    .outerjoin(
+        contraparte,
+        and_(
+            mov.transaccion_id.isnot(None),
+            contraparte.id == id_contraparte
+        )
+    )\
+    .outerjoin(cuenta_contraparte, cuenta_contraparte.id == contraparte.cuenta_id)\
+    .filter(
+        mov.usuario_id == usuario_id,
+        or_(mov.transaccion_id.is_(None), ~pata_mas_reciente)
+    )
+
+
+def agrupar_fila(fila, usuario_id: int):
+    """Convierte una fila de consulta_agrupada en el formato de la API."""
+
+    # 🔹 Movimiento normal
+    if fila.transaccion_id is None:
+        return {
+            "id": fila.id,
+            "tipo": fila.tipo,
+            "monto": float(fila.monto),
+            "categoria": fila.categoria,
+            "descripcion": fila.descripcion,
+            "fecha": fila.fecha
+        }
+
+    # 🔥 Transferencia
+    propia = (fila.tipo, fila.usuario_id, fila.cuenta_nombre)
+    otra = (fila.contraparte_tipo, fila.contraparte_usuario_id, fila.contraparte_cuenta)
+
+    salida = next((p for p in (propia, otra) if p[0] == "gasto"), None)
+    entrada = next((p for p in (propia, otra) if p[0] == "ingreso"), None)
+
+    if salida and salida[1] == usuario_id:
+        tipo_transferencia = "transferencia_enviada"
+        monto = -float(fila.monto)
+        descripcion = f"Enviado a {entrada[2]}" if entrada else "Transferencia enviada"
+
+    elif entrada and entrada[1] == usuario_id:
+        tipo_transferencia = "transferencia_recibida"
+        monto = float(fila.monto)
+        descripcion = f"Recibido de {salida[2]}" if salida else "Transferencia recibida"
+
+    else:
+        tipo_transferencia = "transferencia"
+        monto = float(fila.monto)
+        descripcion = "Transferencia"
+
+    return {
+        "transaccion_id": fila.transaccion_id,
+        "tipo": tipo_transferencia,
+        "monto": monto,
+        "descripcion": descripcion,
+        "cuenta_origen": salida[2] if salida else None,
+        "cuenta_destino": entrada[2] if entrada else None,
+        "fecha": fila.fecha
+    }
+
+
+def listar_agrupados(
+    db: Session,
+    usuario_id: int,
+    limit: int,
+    after: str | None = None
+):
+    """Página de la vista agrupada. Devuelve (items, next_cursor)."""
+
+    filas, next_cursor = paginar(
+        consulta_agrupada(db, usuario_id),
+        models.Movimiento,
+        limit,
+        after
+    )
+
+    return [agrupar_fila(f, usuario_id) for f in filas], next_cursor
+
+
+def neto_previo(db: Session, usuario_id: int, desde: date, cuenta_id: int | None = None):
+    """
+    Ingresos - gastos de todos los movimientos anteriores a `desde`, en
+    una sentencia: meses completos desde el resumen mensual + lo que va
+    del mes de `desde` desde movimientos.
+    """
+
+    resumen = fuente_resumen(db, usuario_id, None, mes_anterior(desde.year, desde.month))
+    mov = models.Movimiento
+
+    filtros_resumen = [
+        resumen.usuario_id == usuario_id,
+        tuple_(resumen.anio, resumen.mes) < (desde.year, desde.month)
+    ]
+    filtros_mes = [
+        mov.usuario_id == usuario_id,
+        mov.fecha >= datetime(desde.year, desde.month, 1),
+        mov.fecha < datetime(desde.year, desde.month, desde.day)
+    ]
+
+    if cuenta_id is not None:
+        filtros_resumen.append(resumen.cuenta_id == cuenta_id)
+        filtros_mes.append(mov.cuenta_id == cuenta_id)
+
+    meses = select(func.coalesce(func.sum(
+        case((resumen.tipo == "ingreso", resumen.total), else_=-resumen.total)
+    ), 0)).where(*filtros_resumen).scalar_subquery()
+
+    mes_en_curso = select(func.coalesce(func.sum(
+        case((mov.tipo == "ingreso", mov.monto), else_=-mov.monto)
+    ), 0)).where(*filtros_mes).scalar_subquery()
+
+    return Decimal(db.query(meses + mes_en_curso).scalar() or 0)
+
+
+def serie_flujo(
+    db: Session,
+    usuario_id: int,
+    desde: date,
+    hasta: date,
+    granularidad: str,
+    cuenta_id: int | None = None
+):
+    """
+    Ingresos, gastos, neto y acumulado del rango por cubeta.
+
+    acumulado es el neto (ingresos - gastos) de todos los movimientos
+    hasta el cierre de la cubeta, no solo los del rango: parte de
+    neto_previo(desde). No incluye saldos de apertura de las cuentas.
+
+    Una consulta para el rango: filtro por fecha (usa los índices por
+    fecha), GROUP BY cubeta y el acumulado con SUM(...) OVER (ORDER BY
+    cubeta). Las cubetas sin movimientos se completan aquí con el
+    acumulado previo.
+    """
+
+    mov = models.Movimiento
+    cubeta = expresion_cubeta(mov.fecha, granularidad, db.get_bind().dialect.name).label("cubeta")
+
+    ingresos = func.coalesce(func.sum(case((mov.tipo == "ingreso", mov.monto), else_=0)), 0)
+    gastos = func.coalesce(func.sum(case((mov.tipo == "gasto", mov.monto), else_=0)), 0)
+
+    filtros = [
+        mov.usuario_id == usuario_id,
+        mov.fecha >= datetime(desde.year, desde.month, desde.day),
+        mov.fecha < datetime(hasta.year, hasta.month, hasta.day) + timedelta(days=1),
+    ]
+
+    if cuenta_id is not None:
+        filtros.append(mov.cuenta_id == cuenta_id)
+
+    filas = db.query(
+        cubeta,
+        ingresos.label("ingresos"),
+        gastos.label("gastos"),
+        func.sum(ingresos - gastos).over(order_by=cubeta).label("acumulado")
+    )\
+    .filter(*filtros)\
+    .group_by(cubeta)\
+    .order_by(cubeta)\
+    .all()
+
+    # SQLite devuelve texto y Postgres date: se normaliza a date
+    por_cubeta = {date.fromisoformat(str(f.cubeta)[:10]): f for f in filas}
+
+    previo = neto_previo(db, usuario_id, desde, cuenta_id)
+
+    puntos = []
+    acumulado = previo
+
+    for inicio in cubetas(desde, hasta, granularidad):
+        fila = por_cubeta.get(inicio)
+
+        if fila is None:
+            puntos.append({
+                "periodo": inicio, "ingresos": 0, "gastos": 0,
+                "neto": 0, "acumulado": acumulado
+            })
+            continue
+
+        acumulado = previo + Decimal(fila.acumulado)
+        puntos.append({
+            "periodo": inicio,
+            "ingresos": fila.ingresos,
+            "gastos": fila.gastos,
+            "neto": fila.ingresos - fila.gastos,
+            "acumulado": acumulado
+        })
+
+    return puntos
@@ -0,0 +1,60 @@
+import base64
+from datetime import datetime
+from sqlalchemy import or_, and_
+
+
+def codificar_cursor(fecha: datetime, movimiento_id: int):
+
+    crudo = f"{fecha.isoformat()}|{movimiento_id}"
+    return base64.urlsafe_b64encode(crudo.encode()).decode()
+
+
+def decodificar_cursor(cursor: str):
+    """Devuelve (fecha, id). Lanza ValueError si el cursor no es válido."""
+
+    try:
+        crudo = base64.urlsafe_b64decode(cursor.encode()).decode()
+        fecha, movimiento_id = crudo.split("|")
+        return datetime.fromisoformat(fecha), int(movimiento_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Cursor inválido") from e
+
+
+def despues_de(modelo, fecha: datetime, movimiento_id: int):
+    """
+    Condición keyset para orden (fecha desc, id desc): filas posteriores
+    al cursor en ese orden.
+    """
+
+    return or_(
+        modelo.fecha < fecha,
+        and_(modelo.fecha == fecha, modelo.id < movimiento_id)
+    )
+
+
+
+def paginar(query, modelo, limit: int, after: str | None):
+    """
+    Paginación keyset sobre (fecha desc, id desc) del modelo indicado.
+
+    Las filas deben exponer .fecha e .id (entidades o columnas con esos
+    nombres). Devuelve (filas, next_cursor); lanza ValueError si el
+    cursor no es válido.
+    """
+
+    if after:
+        fecha, movimiento_id = decodificar_cursor(after)
+        query = query.filter(despues_de(modelo, fecha, movimiento_id))
+
+    filas = query.order_by(
+        modelo.fecha.desc(),
+        modelo.id.desc()
+    ).limit(limit + 1).all()
+
+    if len(filas) <= limit:
+        return filas, None
+
+    filas = filas[:limit]
+    ultimo = filas[-1]
+
+    return filas, codificar_cursor(ultimo.fecha, ultimo.id)
@@ -0,0 +1,97 @@
+from datetime import datetime, date, timedelta
+
+from sqlalchemy import func
+
+
+def rango_mes(anio: int, mes: int):
+    """Devuelve el rango semiabierto [inicio, fin) del mes indicado."""
+
+    inicio = datetime(anio, mes, 1)
+
+    if mes == 12:
+        fin = datetime(anio + 1, 1, 1)
+    else:
+        fin = datetime(anio, mes + 1, 1)
+
+    return inicio, fin
+
+
+def rango_anio(anio: int):
+    """Devuelve el rango semiabierto [inicio, fin) del año indicado."""
+
+    return datetime(anio, 1, 1), datetime(anio + 1, 1, 1)
+
+
+def filtro_periodo(columna, anio: int, mes: int | None = None):
+    """
+    Condiciones de rango sobre una columna de fecha.
+
+    Se usan en lugar de extract("month"/"year") para que los índices
+    sobre (usuario_id, ..., fecha) puedan resolver el filtro.
+    """
+
+    inicio, fin = rango_mes(anio, mes) if mes is not None else rango_anio(anio)
+
+    return [columna >= inicio, columna < fin]
+
+
+def mes_anterior(anio: int, mes: int):
+
+    if mes == 1:
+        return anio - 1, 12
+
+    return anio, mes - 1
+
+
+# 🔹 Cubetas de series de tiempo (semanas ISO, empiezan el lunes)
+
+GRANULARIDADES = ("dia", "semana", "mes")
+
+
+def inicio_cubeta(dia: date, granularidad: str):
+
+    if granularidad == "semana":
+        return dia - timedelta(days=dia.weekday())
+
+    if granularidad == "mes":
+        return dia.replace(day=1)
+
+    return dia
+
+
+def siguiente_cubeta(inicio: date, granularidad: str):
+
+    if granularidad == "semana":
+        return inicio + timedelta(days=7)
+
+    if granularidad == "mes":
+        return date(inicio.year + inicio.month // 12, inicio.month % 12 + 1, 1)
+
+    return inicio + timedelta(days=1)
+
+
+def cubetas(desde: date, hasta: date, granularidad: str):
+    """Inicios de todas las cubetas entre desde y hasta (inclusive)."""
+
+    actual = inicio_cubeta(desde, granularidad)
+
+    while actual <= hasta:
+        yield actual
+        actual = siguiente_cubeta(actual, granularidad)
+
+
+def expresion_cubeta(columna, granularidad: str, dialecto: str):
+    """Inicio de la cubeta de una columna de fecha, en SQL del dialecto."""
+
+    if dialecto == "postgresql":
+        unidad = {"dia": "day", "semana": "week", "mes": "month"}[granularidad]
+        return func.date(func.date_trunc(unidad, columna))
+
+    # SQLite: 'weekday 0' avanza al domingo, -6 días vuelve al lunes
+    if granularidad == "semana":
+        return func.date(columna, "weekday 0", "-6 days")
+
+    if granularidad == "mes":
+        return func.date(columna, "start of month")
+
+    return func.date(columna)
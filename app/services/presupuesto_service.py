@@ -1,6 +1,8 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
+from sqlalchemy import func, and_
 from app import models
+from app.services.periodos import filtro_periodo
+from app.services.resumen_service import fuente_resumen
 
 
 def evaluar_presupuesto(
@@ -24,16 +26,19 @@ def evaluar_presupuesto(
     gasto_actual = db.query(
         func.coalesce(func.sum(models.Movimiento.monto), 0)
     )\
-    .join(models.Cuenta)\
     .filter(
-        models.Cuenta.usuario_id == usuario_id,
+        models.Movimiento.usuario_id == usuario_id,
         models.Movimiento.tipo == "gasto",
         models.Movimiento.categoria == categoria,
-        extract("month", models.Movimiento.fecha) == mes,
-        extract("year", models.Movimiento.fecha) == anio
+        *filtro_periodo(models.Movimiento.fecha, anio, mes)
     ).scalar()
 
-    porcentaje = (gasto_actual / presupuesto.monto_limite) * 100
+    porcentaje = (float(gasto_actual) / presupuesto.monto_limite) * 100
+
+    return mensaje_alerta(porcentaje)
+
+
+def mensaje_alerta(porcentaje: float):
 
     if porcentaje >= 100:
         return "🚨 EXCEDISTE TU PRESUPUESTO"
@@ -41,3 +46,85 @@ def evaluar_presupuesto(
         return "⚠️ Estás cerca del límite"
 
     return None
+
+
+def presupuestos_con_gasto(db: Session, mes: int, anio: int, *filtros, resumen=None):
+    """
+    (Presupuesto, gastado) de los presupuestos del mes que cumplan
+    `filtros`, en una sola consulta agrupada contra el resumen mensual
+    (o la entidad `resumen` que se indique, ver fuente_resumen).
+    """
+
+    resumen = resumen or models.MovimientoResumenMensual
+
+    return db.query(
+        models.Presupuesto,
+        func.coalesce(func.sum(resumen.total), 0).label("gastado")
+    )\
+    .outerjoin(
+        resumen,
+        and_(
+            resumen.usuario_id == models.Presupuesto.usuario_id,
+            resumen.categoria == models.Presupuesto.categoria,
+            resumen.anio == models.Presupuesto.anio,
+            resumen.mes == models.Presupuesto.mes,
+            resumen.tipo == "gasto"
+        )
+    )\
+    .filter(
+        models.Presupuesto.mes == mes,
+        models.Presupuesto.anio == anio,
+        *filtros
+    )\
+    .group_by(models.Presupuesto.id)\
+    .all()
+
+
+def estado_presupuesto(limite: float, gastado):
+    """(porcentaje usado, estado OK / ALERTA / EXCEDIDO)."""
+
+    porcentaje = (float(gastado) / limite) * 100 if limite > 0 else 0
+
+    estado = "OK"
+
+    if porcentaje >= 100:
+        estado = "EXCEDIDO"
+    elif porcentaje >= 80:
+        estado = "ALERTA"
+
+    return porcentaje, estado
+
+
+def evaluar_presupuestos(
+    db: Session,
+    usuario_id: int,
+    mes: int,
+    anio: int
+):
+    """
+    Evalúa todos los presupuestos del usuario para el mes en una sola
+    consulta agrupada contra el resumen mensual.
+    """
+
+    filas = presupuestos_con_gasto(
+        db, mes, anio, models.Presupuesto.usuario_id == usuario_id,
+        resumen=fuente_resumen(db, usuario_id, (anio, mes), (anio, mes))
+    )
+
+    resultados = []
+
+    for presupuesto, gastado in filas:
+
+        limite = presupuesto.monto_limite
+        porcentaje, estado = estado_presupuesto(limite, gastado)
+
+        resultados.append({
+            "categoria": presupuesto.categoria,
+            "limite": limite,
+            "gastado": gastado,
+            "porcentaje": round(porcentaje, 2),
+            "estado": estado,
+            "alerta": mensaje_alerta(porcentaje)
+        })
+
+    return resultados
@@ -0,0 +1,279 @@
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import (
+    func, extract, update, delete, insert, select, cast, exists, and_, or_,
+    tuple_, union_all, Integer
+)
+from sqlalchemy.exc import IntegrityError
+from app import models
+from app.services.periodos import rango_mes
+
+Resumen = models.MovimientoResumenMensual
+
+
+def ajustar_resumen(
+    db: Session,
+    usuario_id: int,
+    cuenta_id: int,
+    fecha,
+    tipo: str,
+    categoria: str,
+    monto,
+    signo: int = 1,
+    cantidad: int = 1
+):
+    """
+    Suma (signo=1) o resta (signo=-1) un movimiento en el resumen mensual.
+    Con cantidad > 1, monto es el total ya agregado de varios movimientos.
+
+    Trabaja dentro de la transacción de la sesión: el commit lo hace
+    quien llama, junto con el propio movimiento.
+    """
+
+    clave = [
+        Resumen.usuario_id == usuario_id,
+        Resumen.cuenta_id == cuenta_id,
+        Resumen.anio == fecha.year,
+        Resumen.mes == fecha.month,
+        Resumen.tipo == tipo,
+        Resumen.categoria == categoria,
+    ]
+
+    sumar = update(Resumen)\
+        .where(*clave)\
+        .values(
+            total=Resumen.total + signo * monto,
+            cantidad=Resumen.cantidad + signo * cantidad
+        )
+
+    resultado = db.execute(sumar)
+
+    if resultado.rowcount == 0 and signo > 0:
+        # Primera fila de la clave; si otro request la creó a la vez,
+        # se reintenta el update
+        try:
+            with db.begin_nested():
+                db.execute(
+                    insert(Resumen).values(
+                        usuario_id=usuario_id,
+                        cuenta_id=cuenta_id,
+                        anio=fecha.year,
+                        mes=fecha.month,
+                        tipo=tipo,
+                        categoria=categoria,
+                        total=monto,
+                        cantidad=cantidad
+                    )
+                )
+        except IntegrityError:
+            db.execute(sumar)
+
+    elif signo < 0:
+        # 🧹 Quitar filas que ya no representan movimientos
+        db.execute(
+            delete(Resumen).where(*clave, Resumen.cantidad <= 0)
+        )
+
+
+def sumar_movimiento(db: Session, movimiento: models.Movimiento):
+
+    # fecha se asigna por defecto al insertar
+    if movimiento.fecha is None:
+        db.flush()
+
+    ajustar_resumen(
+        db,
+        usuario_id=movimiento.usuario_id,
+        cuenta_id=movimiento.cuenta_id,
+        fecha=movimiento.fecha,
+        tipo=movimiento.tipo,
+        categoria=movimiento.categoria,
+        monto=movimiento.monto,
+        signo=1
+    )
+
+
+def restar_movimiento(db: Session, movimiento: models.Movimiento):
+
+    ajustar_resumen(
+        db,
+        usuario_id=movimiento.usuario_id,
+        cuenta_id=movimiento.cuenta_id,
+        fecha=movimiento.fecha,
+        tipo=movimiento.tipo,
+        categoria=movimiento.categoria,
+        monto=movimiento.monto,
+        signo=-1
+    )
+
+
+# 🔹 Lectura con respaldo en movimientos
+
+def _meses(desde, hasta):
+
+    anio, mes = desde
+
+    while (anio, mes) <= tuple(hasta):
+        yield anio, mes
+        anio, mes = anio + mes // 12, mes % 12 + 1
+
+
+def fuente_resumen(db: Session, usuario_id: int, desde=None, hasta=None):
+    """
+    Entidad con las columnas del resumen mensual del usuario entre los
+    meses (anio, mes) desde y hasta, inclusive (None = desde el primer /
+    hasta el último movimiento).
+
+    Normalmente es el propio MovimientoResumenMensual. Si algún mes del
+    rango no tiene filas de resumen pero sí movimientos (datos anteriores
+    al resumen que aún no pasaron por reconstruir_resumen), esos meses se
+    agregan desde movimientos y se unen a las filas del resumen.
+    """
+
+    Movimiento = models.Movimiento
+
+    if desde is None or hasta is None:
+        primera, ultima = db.query(func.min(Movimiento.fecha), func.max(Movimiento.fecha))\
+            .filter(Movimiento.usuario_id == usuario_id)\
+            .one()
+
+        if primera is None:
+            return Resumen
+
+        desde = desde or (primera.year, primera.month)
+        hasta = hasta or (ultima.year, ultima.month)
+
+    cubiertos = set(
+        db.query(Resumen.anio, Resumen.mes)
+        .filter(
+            Resumen.usuario_id == usuario_id,
+            tuple_(Resumen.anio, Resumen.mes) >= tuple(desde),
+            tuple_(Resumen.anio, Resumen.mes) <= tuple(hasta)
+        )
+        .distinct()
+        .all()
+    )
+
+    # Meses sin resumen, unidos en rangos de fecha contiguos
+    rangos = []
+
+    for periodo in _meses(desde, hasta):
+        if periodo in cubiertos:
+            continue
+
+        inicio, fin = rango_mes(*periodo)
+
+        if rangos and rangos[-1][1] == inicio:
+            rangos[-1][1] = fin
+        else:
+            rangos.append([inicio, fin])
+
+    if not rangos:
+        return Resumen
+
+    sin_resumen = or_(*[
+        and_(Movimiento.fecha >= inicio, Movimiento.fecha < fin)
+        for inicio, fin in rangos
+    ])
+
+    hay_movimientos = db.query(
+        exists().where(Movimiento.usuario_id == usuario_id, sin_resumen)
+    ).scalar()
+
+    if not hay_movimientos:
+        return Resumen
+
+    anio = cast(extract("year", Movimiento.fecha), Integer)
+    mes = cast(extract("month", Movimiento.fecha), Integer)
+
+    desde_movimientos = select(
+        func.min(Movimiento.id).label("id"),
+        Movimiento.usuario_id,
+        Movimiento.cuenta_id,
+        anio.label("anio"),
+        mes.label("mes"),
+        Movimiento.tipo,
+        Movimiento.categoria,
+        func.sum(Movimiento.monto).label("total"),
+        func.count(Movimiento.id).label("cantidad")
+    )\
+    .where(Movimiento.usuario_id == usuario_id, sin_resumen)\
+    .group_by(
+        Movimiento.usuario_id,
+        Movimiento.cuenta_id,
+        anio,
+        mes,
+        Movimiento.tipo,
+        Movimiento.categoria
+    )
+
+    del_resumen = select(
+        Resumen.id,
+        Resumen.usuario_id,
+        Resumen.cuenta_id,
+        Resumen.anio,
+        Resumen.mes,
+        Resumen.tipo,
+        Resumen.categoria,
+        Resumen.total,
+        Resumen.cantidad
+    ).where(Resumen.usuario_id == usuario_id)
+
+    return aliased(
+        Resumen,
+        union_all(del_resumen, desde_movimientos).subquery("resumen_con_movimientos")
+    )
+
+
+def reconstruir_resumen(db: Session, usuario_id: int | None = None):
+    """
+    Recalcula el resumen mensual desde cero a partir de movimientos.
+
+    Sirve para reparar desvíos; si se indica usuario_id solo se
+    reconstruye ese usuario.
+    """
+
+    borrar = delete(Resumen)
+    filtros = []
+
+    if usuario_id is not None:
+        borrar = borrar.where(Resumen.usuario_id == usuario_id)
+        filtros.append(models.Movimiento.usuario_id == usuario_id)
+
+    db.execute(borrar)
+
+    anio = extract("year", models.Movimiento.fecha)
+    mes = extract("month", models.Movimiento.fecha)
+
+    origen = select(
+        models.Movimiento.usuario_id,
+        models.Movimiento.cuenta_id,
+        anio,
+        mes,
+        models.Movimiento.tipo,
+        models.Movimiento.categoria,
+        func.sum(models.Movimiento.monto),
+        func.count(models.Movimiento.id)
+    )\
+    .where(*filtros)\
+    .group_by(
+        models.Movimiento.usuario_id,
+        models.Movimiento.cuenta_id,
+        anio,
+        mes,
+        models.Movimiento.tipo,
+        models.Movimiento.categoria
+    )
+
+    resultado = db.execute(
+        insert(Resumen).from_select(
+            [
+                "usuario_id", "cuenta_id", "anio", "mes",
+                "tipo", "categoria", "total", "cantidad"
+            ],
+            origen
+        )
+    )
+
+    db.commit()
+
+    return resultado.rowcount
@@ -0,0 +1,101 @@
+"""
+Cambios de saldo/cupo en una sola sentencia UPDATE.
+
+En lugar de leer la cuenta, ajustar en Python y escribir, cada cambio es
+un UPDATE condicional (`... WHERE saldo + :delta >= 0 RETURNING ...`).
+La base de datos serializa las escrituras sobre la misma fila, así dos
+requests concurrentes no se pisan y no hace falta SELECT ... FOR UPDATE.
+
+- Cuentas débito/ahorro/inversión: el delta se aplica a saldo.
+- Cuentas crédito: el delta se aplica a cupo_disponible, sin superar
+  cupo_total (el recorte se hace en SQL).
+"""
+from sqlalchemy import update, case, literal
+from sqlalchemy.orm import Session
+
+from app import models
+
+Cuenta = models.Cuenta
+
+
+def efecto(tipo: str, monto):
+    """Delta sobre el disponible de la cuenta: gasto resta, ingreso suma."""
+
+    return -monto if tipo == "gasto" else monto
+
+
+def aplicar_delta(
+    db: Session,
+    cuenta_id: int,
+    delta,
+    usuario_id: int | None = None,
+    validar: bool = True
+):
+    """
+    Suma delta al saldo (o al cupo disponible si es crédito) de la cuenta.
+
+    Con validar=True y delta negativo solo actualiza si el disponible
+    alcanza. Si se indica usuario_id, la cuenta debe ser de ese usuario.
+    Devuelve la fila ya actualizada (id, tipo_cuenta, saldo,
+    cupo_disponible, cupo_total) o None si no se actualizó nada
+    (cuenta inexistente/ajena o fondos insuficientes).
+    """
+
+    debe_validar = validar and delta < 0
+    delta = literal(delta, Cuenta.saldo.type)
+    es_credito = Cuenta.tipo_cuenta == "credito"
+
+    nuevo_cupo = Cuenta.cupo_disponible + delta
+
+    filtros = [Cuenta.id == cuenta_id]
+
+    if usuario_id is not None:
+        filtros.append(Cuenta.usuario_id == usuario_id)
+
+    if debe_validar:
+        disponible = case(
+            (es_credito, Cuenta.cupo_disponible),
+            else_=Cuenta.saldo
+        )
+        filtros.append(disponible + delta >= 0)
+
+    sentencia = update(Cuenta)\
+        .where(*filtros)\
+        .values(
+            saldo=case((es_credito, Cuenta.saldo), else_=Cuenta.saldo + delta),
+            cupo_disponible=case(
+                (~es_credito, Cuenta.cupo_disponible),
+                (nuevo_cupo > Cuenta.cupo_total, Cuenta.cupo_total),
+                else_=nuevo_cupo
+            )
+        )\
+        .returning(
+            Cuenta.id, Cuenta.tipo_cuenta, Cuenta.saldo,
+            Cuenta.cupo_disponible, Cuenta.cupo_total
+        )\
+        .execution_options(synchronize_session=False)
+
+    return db.execute(sentencia).first()
+
+
+def motivo_rechazo(db: Session, cuenta_id: int, usuario_id: int | None = None):
+    """
+    Explica por qué aplicar_delta no actualizó: 404 si la cuenta no existe
+    (o no es del usuario), 400 por saldo/cupo. Solo se consulta en el
+    camino de error.
+    """
+
+    consulta = db.query(Cuenta.tipo_cuenta).filter(Cuenta.id == cuenta_id)
+
+    if usuario_id is not None:
+        consulta = consulta.filter(Cuenta.usuario_id == usuario_id)
+
+    fila = consulta.first()
+
+    if fila is None:
+        return 404, "Cuenta no encontrada"
+
+    if fila.tipo_cuenta == "credito":
+        return 400, "Cupo insuficiente"
+
+    return 400, "Saldo insuficiente"
@@ -0,0 +1,172 @@
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from uuid import uuid4
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app import models
+from app.services.resumen_service import ajustar_resumen
+from app.services.saldos_service import aplicar_delta
+from app.services.libro_service import registrar_asientos, conciliar
+from app.services.version_service import incrementar_version
+
+
+class TransferenciaRechazada(Exception):
+
+    def __init__(self, estado: int, detalle):
+        super().__init__(detalle)
+        self.estado = estado
+        self.detalle = detalle
+
+
+def transferir_lote(db: Session, usuario_id: int, transferencias: list):
+    """
+    Varias transferencias en una sola transacción, todo o nada.
+
+    - Trae y bloquea todas las cuentas en una consulta, en orden de id
+      (FOR UPDATE), así dos lotes cruzados no se bloquean entre sí.
+    - Neta los deltas y hace un UPDATE condicional por cuenta.
+    - Inserta todos los movimientos con un único executemany.
+
+    Las cuentas origen deben ser del usuario; los destinos pueden ser de
+    otros usuarios. Lanza TransferenciaRechazada si algo no cuadra; quien
+    llama hace rollback.
+    """
+
+    errores = []
+
+    for indice, t in enumerate(transferencias):
+        if t.cuenta_origen_id == t.cuenta_destino_id:
+            errores.append({"indice": indice, "detalle": "No puedes transferir a la misma cuenta"})
+        elif t.monto <= 0:
+            errores.append({"indice": indice, "detalle": "El monto debe ser mayor a cero"})
+
+    if errores:
+        raise TransferenciaRechazada(400, errores)
+
+    # 🔒 1. Cuentas implicadas: una consulta, bloqueadas en orden de id
+    ids = {t.cuenta_origen_id for t in transferencias} | {t.cuenta_destino_id for t in transferencias}
+
+    cuentas = {
+        c.id: c
+        for c in db.query(models.Cuenta)
+        .filter(models.Cuenta.id.in_(ids))
+        .order_by(models.Cuenta.id)
+        .with_for_update()
+        .all()
+    }
+
+    for indice, t in enumerate(transferencias):
+        origen = cuentas.get(t.cuenta_origen_id)
+
+        if origen is None or origen.usuario_id != usuario_id:
+            errores.append({"indice": indice, "detalle": "Cuenta origen no encontrada"})
+        elif origen.tipo_cuenta == "credito":
+            errores.append({"indice": indice, "detalle": "No puedes transferir desde una cuenta crédito"})
+        elif t.cuenta_destino_id not in cuentas:
+            errores.append({"indice": indice, "detalle": "Cuenta destino no encontrada"})
+
+    if errores:
+        raise TransferenciaRechazada(404, errores)
+
+    # 💰 2. Deltas netos, un UPDATE por cuenta en orden de id
+    netos = defaultdict(Decimal)
+
+    for t in transferencias:
+        netos[t.cuenta_origen_id] -= Decimal(t.monto)
+        netos[t.cuenta_destino_id] += Decimal(t.monto)
+
+    actualizadas = {}
+
+    for cuenta_id in sorted(netos):
+        if not netos[cuenta_id]:
+            continue
+
+        fila = aplicar_delta(db, cuenta_id, netos[cuenta_id])
+
+        if fila is None:
+            raise TransferenciaRechazada(
+                400, [{"cuenta_id": cuenta_id, "detalle": "Saldo insuficiente"}]
+            )
+
+        actualizadas[cuenta_id] = fila
+
+    # 🧾 3. Movimientos (dos por transferencia) en un executemany
+    ahora = datetime.utcnow()
+    filas = []
+    transacciones = []
+
+    for t in transferencias:
+        transaccion_id = str(uuid4())
+        transacciones.append(transaccion_id)
+        monto = Decimal(t.monto)
+
+        for cuenta, tipo, descripcion in (
+            (cuentas[t.cuenta_origen_id], "gasto", "Transferencia enviada"),
+            (cuentas[t.cuenta_destino_id], "ingreso", "Transferencia recibida"),
+        ):
+            filas.append({
+                "usuario_id": cuenta.usuario_id,
+                "cuenta_id": cuenta.id,
+                "tipo": tipo,
+                "monto": monto,
+                "categoria": "transferencia",
+                "descripcion": t.descripcion or descripcion,
+                "transaccion_id": transaccion_id,
+                "fecha": ahora
+            })
+
+    ids_movimientos = db.execute(
+        insert(models.Movimiento).returning(models.Movimiento.id, sort_by_parameter_order=True),
+        filas
+    ).scalars().all()
+
+    # 📊 4. Resumen mensual, libro y versiones
+    resumen = defaultdict(lambda: [Decimal(0), 0])
+
+    for fila in filas:
+        clave = (fila["usuario_id"], fila["cuenta_id"], fila["tipo"])
+        resumen[clave][0] += fila["monto"]
+        resumen[clave][1] += 1
+
+    for (usuario, cuenta_id, tipo), (total, cantidad) in resumen.items():
+        ajustar_resumen(
+            db,
+            usuario_id=usuario,
+            cuenta_id=cuenta_id,
+            fecha=ahora,
+            tipo=tipo,
+            categoria="transferencia",
+            monto=total,
+            cantidad=cantidad
+        )
+
+    registrar_asientos(db, [
+        {
+            "cuenta_id": fila["cuenta_id"],
+            "movimiento_id": movimiento_id,
+            "concepto": "movimiento",
+            "delta": fila["monto"] if fila["tipo"] == "ingreso" else -fila["monto"],
+            "fecha": ahora
+        }
+        for fila, movimiento_id in zip(filas, ids_movimientos)
+    ])
+
+    # Abonos a crédito recortados a cupo_total
+    for fila in actualizadas.values():
+        if fila.tipo_cuenta == "credito" and fila.cupo_disponible == fila.cupo_total:
+            conciliar(db, fila.id, fila.cupo_disponible, ahora)
+
+    for usuario in {c.usuario_id for c in cuentas.values()}:
+        incrementar_version(db, usuario)
+
+    db.commit()
+
+    return {
+        "mensaje": "Transferencias realizadas correctamente",
+        "cantidad": len(transferencias),
+        "monto_total": float(sum(Decimal(t.monto) for t in transferencias)),
+        "transacciones": transacciones
+    }
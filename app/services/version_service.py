@@ -0,0 +1,63 @@
+from datetime import datetime
+
+from sqlalchemy import update, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import models
+
+Version = models.VersionUsuario
+
+
+def incrementar_version(db: Session, usuario_id: int):
+    """
+    Sube la versión de datos del usuario dentro de la transacción en
+    curso; el commit lo hace quien llama, junto con la escritura.
+    """
+
+    ahora = datetime.utcnow()
+
+    resultado = db.execute(
+        update(Version)
+        .where(Version.usuario_id == usuario_id)
+        .values(version=Version.version + 1, actualizado_en=ahora)
+    )
+
+    if resultado.rowcount:
+        return
+
+    # Primera escritura del usuario; si otro request la creó a la vez,
+    # se reintenta el update
+    try:
+        with db.begin_nested():
+            db.execute(
+                insert(Version).values(usuario_id=usuario_id, version=1, actualizado_en=ahora)
+            )
+    except IntegrityError:
+        db.execute(
+            update(Version)
+            .where(Version.usuario_id == usuario_id)
+            .values(version=Version.version + 1, actualizado_en=ahora)
+        )
+
+
+def version_datos(db: Session, usuario_id: int):
+
+    version = db.query(Version.version)\
+        .filter(Version.usuario_id == usuario_id)\
+        .scalar()
+
+    return version or 0
+
+
+def marca_datos(db: Session, usuario_id: int):
+    """(versión, fecha de la última escritura) del usuario; (0, None) si nunca escribió."""
+
+    fila = db.query(Version.version, Version.actualizado_en)\
+        .filter(Version.usuario_id == usuario_id)\
+        .first()
+
+    if fila is None:
+        return 0, None
+
+    return fila.version, fila.actualizado_en